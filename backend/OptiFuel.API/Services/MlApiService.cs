@@ -1,3 +1,6 @@
+using System.Buffers.Binary;
+using System.Net.Http.Headers;
+using System.Text.Json;
 using OptiFuel.API.Models;
 
 namespace OptiFuel.API.Services;
@@ -9,6 +12,14 @@ public class MlApiServiceSettings
 
 public class MlApiService
 {
+    // The explanation chart only renders the strongest factors
+    private const int ExplanationTopK = 8;
+
+    // Compact format of the ML service batch endpoints: two little-endian uint32
+    // (rows, columns) followed by rows * columns little-endian float64 values
+    private const string BinaryMediaType = "application/x-optifuel-f64";
+    private const int BinaryHeaderSize = 8;
+
     private readonly HttpClient _httpClient;
 
     public MlApiService(HttpClient httpClient)
@@ -27,10 +38,109 @@ public class MlApiService
 
     public async Task<Dictionary<string, double>?> GetExplanationAsync(PredictionRequest request)
     {
-        var response = await _httpClient.PostAsJsonAsync("/explain", request);
+        var response = await _httpClient.PostAsJsonAsync($"/explain?top_k={ExplanationTopK}", request);
 
         response.EnsureSuccessStatusCode();
-        
+
         return await response.Content.ReadFromJsonAsync<Dictionary<string, double>>();
     }
-}
\ No newline at end of file
+
+    /// <summary>
+    /// Predicts fuel consumption for many voyages in one call. Prefers the binary
+    /// format and falls back to JSON if the ML service does not offer it.
+    /// </summary>
+    public async Task<IReadOnlyList<double>> GetPredictionsAsync(IReadOnlyList<PredictionRequest> requests)
+    {
+        using var response = await PostBatchAsync("/predict/batch", requests);
+
+        if (IsBinary(response))
+        {
+            var (_, _, values) = ReadMatrix(await response.Content.ReadAsByteArrayAsync());
+            return values;
+        }
+
+        var predictions = await response.Content.ReadFromJsonAsync<List<PredictionResponse>>();
+        return predictions?.Select(p => p.PredictedFuelConsumption).ToList() ?? new List<double>();
+    }
+
+    /// <summary>
+    /// Explains many voyages in one call. The binary format always carries every
+    /// feature; the column names come from the X-Feature-Order header.
+    /// </summary>
+    public async Task<IReadOnlyList<Dictionary<string, double>>> GetExplanationsAsync(IReadOnlyList<PredictionRequest> requests)
+    {
+        using var response = await PostBatchAsync("/explain/batch", requests);
+
+        if (!IsBinary(response))
+        {
+            var explanations = await response.Content.ReadFromJsonAsync<List<Dictionary<string, double>>>();
+            return explanations ?? new List<Dictionary<string, double>>();
+        }
+
+        var featureOrder = response.Headers.TryGetValues("X-Feature-Order", out var header)
+            ? JsonSerializer.Deserialize<string[]>(header.First())
+            : null;
+        if (featureOrder == null)
+        {
+            throw new InvalidDataException("ML service binary explanation is missing the X-Feature-Order header.");
+        }
+
+        var (rows, columns, values) = ReadMatrix(await response.Content.ReadAsByteArrayAsync());
+        if (columns != featureOrder.Length)
+        {
+            throw new InvalidDataException($"ML service returned {columns} columns for {featureOrder.Length} features.");
+        }
+
+        var result = new List<Dictionary<string, double>>(rows);
+        for (var row = 0; row < rows; row++)
+        {
+            var explanation = new Dictionary<string, double>(columns);
+            for (var column = 0; column < columns; column++)
+            {
+                explanation[featureOrder[column]] = values[row * columns + column];
+            }
+            result.Add(explanation);
+        }
+        return result;
+    }
+
+    private async Task<HttpResponseMessage> PostBatchAsync(string path, IReadOnlyList<PredictionRequest> requests)
+    {
+        var message = new HttpRequestMessage(HttpMethod.Post, path)
+        {
+            Content = JsonContent.Create(requests)
+        };
+        message.Headers.Accept.Add(new MediaTypeWithQualityHeaderValue(BinaryMediaType));
+        message.Headers.Accept.Add(new MediaTypeWithQualityHeaderValue("application/json", 0.5));
+
+        var response = await _httpClient.SendAsync(message);
+        response.EnsureSuccessStatusCode();
+        return response;
+    }
+
+    private static bool IsBinary(HttpResponseMessage response) =>
+        string.Equals(response.Content.Headers.ContentType?.MediaType, BinaryMediaType, StringComparison.OrdinalIgnoreCase);
+
+    private static (int Rows, int Columns, double[] Values) ReadMatrix(byte[] payload)
+    {
+        if (payload.Length < BinaryHeaderSize)
+        {
+            throw new InvalidDataException("ML service binary response is shorter than its header.");
+        }
+
+        var span = payload.AsSpan();
+        var rows = checked((int)BinaryPrimitives.ReadUInt32LittleEndian(span));
+        var columns = checked((int)BinaryPrimitives.ReadUInt32LittleEndian(span[4..]));
+        var values = new double[checked(rows * columns)];
+        if (payload.Length != BinaryHeaderSize + values.Length * sizeof(double))
+        {
+            throw new InvalidDataException($"ML service binary response has {payload.Length} bytes for a {rows}x{columns} matrix.");
+        }
+
+        for (var i = 0; i < values.Length; i++)
+        {
+            values[i] = BinaryPrimitives.ReadDoubleLittleEndian(span.Slice(BinaryHeaderSize + i * sizeof(double), sizeof(double)));
+        }
+        return (rows, columns, values);
+    }
+}
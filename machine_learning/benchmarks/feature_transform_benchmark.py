@@ -0,0 +1,108 @@
+"""
+Бенчмарк кодування ознак: спільний FeatureEncoder проти колишнього
+pandas-шляху (DataFrame з запиту → get_dummies → reindex(fill_value=0)).
+
+Вимірюється три сценарії: один запит (/predict), батч запитів
+(/predict/batch) і частина сирого CSV (тренування). Для кожного
+перевіряється, що обидва шляхи дають однакову матрицю ознак.
+
+Приклад:
+    python benchmarks/feature_transform_benchmark.py --batch-size 256 --output results/feature_transform.json
+"""
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from ml_service.app.models import PredictionRequest
+from optifuel_common.encoder import MONTH_NUMBERS, FeatureEncoder
+
+
+def legacy_preprocess_input(data: pd.DataFrame, feature_order: list) -> pd.DataFrame:
+    """Кодування запиту, яким сервіс користувався до FeatureEncoder (для порівняння)."""
+    processed_data = data.copy()
+    weather_mapping = {'Calm': 0, 'Moderate': 1, 'Stormy': 2}
+    processed_data['weather_conditions'] = processed_data['weather_conditions'].map(weather_mapping)
+    processed_data['month_sin'] = np.sin(2 * np.pi * processed_data['month'] / 12)
+    processed_data['month_cos'] = np.cos(2 * np.pi * processed_data['month'] / 12)
+    processed_data.drop('month', axis=1, inplace=True)
+    processed_data = pd.get_dummies(processed_data, columns=['ship_type', 'route_id', 'fuel_type'])
+    return processed_data.reindex(columns=feature_order, fill_value=0)
+
+
+def _best_per_call(fn, repeat: int, number: int) -> float:
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def run(raw_csv: Path, batch_size: int, repeat: int) -> dict:
+    encoder = FeatureEncoder.from_schema()
+    feature_order = encoder.feature_order
+
+    raw = pd.read_csv(raw_csv)
+    requests_df = raw[['distance', 'engine_efficiency', 'ship_type', 'route_id', 'fuel_type', 'weather_conditions']].copy()
+    requests_df['month'] = raw['month'].map(MONTH_NUMBERS)
+    requests = [PredictionRequest(**row) for row in requests_df.to_dict(orient='records')]
+
+    single = requests[0]
+    batch = (requests * (batch_size // len(requests) + 1))[:batch_size]
+    legacy_frame = raw.copy()
+    legacy_frame['month'] = legacy_frame['month'].map(MONTH_NUMBERS)
+
+    scenarios = {
+        "single_request": (
+            lambda: legacy_preprocess_input(pd.DataFrame([single.model_dump()]), feature_order),
+            lambda: encoder.transform_one(single),
+            1000,
+        ),
+        "batch": (
+            lambda: legacy_preprocess_input(pd.DataFrame([r.model_dump() for r in batch]), feature_order),
+            lambda: encoder.transform(batch),
+            20,
+        ),
+        "raw_frame": (
+            lambda: legacy_preprocess_input(legacy_frame, feature_order),
+            lambda: encoder.transform_frame(raw),
+            20,
+        ),
+    }
+
+    report = {}
+    for name, (legacy_fn, encoder_fn, number) in scenarios.items():
+        legacy_out = legacy_fn().to_numpy(dtype=np.float64)
+        encoder_out = encoder_fn()
+        legacy_time = _best_per_call(legacy_fn, repeat, number)
+        encoder_time = _best_per_call(encoder_fn, repeat, number)
+        report[name] = {
+            "rows": len(encoder_out),
+            "legacy_pandas_ms": legacy_time * 1000,
+            "feature_encoder_ms": encoder_time * 1000,
+            "speedup": legacy_time / encoder_time,
+            "max_abs_diff": float(np.abs(legacy_out - encoder_out).max()),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FeatureEncoder with the legacy pandas encoding path.")
+    parser.add_argument("--raw-csv", type=Path, default=BASE_DIR / "data/raw/ship_fuel_efficiency.csv")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = {"benchmark": "feature_transform", "results": run(args.raw_csv, args.batch_size, args.repeat)}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text)
+
+
+if __name__ == "__main__":
+    main()
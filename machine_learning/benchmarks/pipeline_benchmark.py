@@ -0,0 +1,92 @@
+"""
+Бенчмарк тренувального конвеєра на синтетичних датасетах зростаючого розміру.
+
+Для кожного розміру генерується сирий CSV, після чого вимірюється:
+  - FuelDataProcessor.execute (в пам'яті) та execute_streaming (частинами);
+  - train.main — пошук, оцінка моделей, експорт артефактів (без графіків).
+
+Кожен прогін працює у тимчасовій директорії, тож робочі data/, artifacts/
+та results/ не змінюються.
+
+Приклад:
+    python benchmarks/pipeline_benchmark.py --sizes 1000 10000 100000 --output results/pipeline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+from synthetic import generate_voyages
+
+TARGET_COLUMN = "fuel_consumption"
+
+
+def _timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def measure_size(n_rows: int, train_args: list, chunksize: int) -> dict:
+    from src.processing.preprocessor import FuelDataProcessor
+    from src.training import train
+
+    with tempfile.TemporaryDirectory(prefix="optifuel_bench_") as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        raw_csv = tmp_dir / "ship_fuel_efficiency.csv"
+        generate_voyages(n_rows).to_csv(raw_csv, index=False)
+
+        result = {"rows": n_rows, "raw_csv_mb": raw_csv.stat().st_size / 2**20}
+        result["preprocess_streaming_seconds"] = _timed(
+            lambda: FuelDataProcessor(raw_csv, tmp_dir / "processed_streaming").execute_streaming(TARGET_COLUMN, chunksize)
+        )
+        result["preprocess_seconds"] = _timed(
+            lambda: FuelDataProcessor(raw_csv, tmp_dir / "processed").execute(TARGET_COLUMN)
+        )
+
+        # train.main працює з директоріями свого модуля — перенаправляємо їх у тимчасову
+        train.PROCESSED_DATA_DIR = tmp_dir / "processed"
+        train.ARTIFACTS_DIR = tmp_dir / "artifacts"
+        train.RESULTS_DIR = tmp_dir / "results"
+        # Підсумкову таблицю train.main друкує у stdout — тут вона лише змішалася б з JSON
+        with contextlib.redirect_stdout(io.StringIO()):
+            result["train_seconds"] = _timed(lambda: train.main(train_args))
+
+        with open(train.RESULTS_DIR / "training_report.json", encoding="utf-8") as f:
+            report = json.load(f)
+        result["best_model"] = report["best_model"]
+        result["models"] = {name: entry["metrics"] for name, entry in report["models"].items()}
+    return result
+
+
+def run(sizes: list, search: str, cv: int, n_jobs: int, chunksize: int) -> list:
+    train_args = ["--search", search, "--cv", str(cv), "--n-jobs", str(n_jobs), "--no-plots"]
+    return [measure_size(n_rows, train_args, chunksize) for n_rows in sizes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark preprocessing and training on synthetic datasets.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--search", choices=["grid", "random", "none"], default="none")
+    parser.add_argument("--cv", type=int, default=3)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--chunksize", type=int, default=20000, help="Chunk size for execute_streaming")
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = {"benchmark": "pipeline", "results": run(args.sizes, args.search, args.cv, args.n_jobs, args.chunksize)}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text)
+
+
+if __name__ == "__main__":
+    main()
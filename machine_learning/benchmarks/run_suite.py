@@ -0,0 +1,147 @@
+"""
+Набір бенчмарків ML-частини одним запуском, з порівнянням з попереднім прогоном.
+
+Запускає сервісний бенчмарк (ендпоінти та етапи інференсу), бенчмарк
+тренувального конвеєра і бенчмарк кодування ознак — усе на синтетичних
+даних, тож працює офлайн. Звіт — один JSON з описом середовища.
+
+З --baseline звіт порівнюється з попереднім: метрики часу (*_ms, *_seconds),
+що зросли, і пропускна здатність, що впала, більше ніж на --tolerance,
+вважаються регресією, і скрипт завершується з кодом 1 — для перевірки
+перед деплоєм.
+
+Приклад:
+    python benchmarks/run_suite.py --output results/bench_new.json --baseline results/bench_main.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+import feature_transform_benchmark
+import pipeline_benchmark
+import service_benchmark
+from synthetic import generate_voyages
+
+# Розміри прогонів: quick — для CI на кожен коміт, full — перед релізом
+PROFILES = {
+    "quick": {"train_rows": 2000, "concurrency": [1, 4], "requests": 300, "sizes": [1000, 5000], "repeat": 3},
+    "full": {"train_rows": 10000, "concurrency": [1, 4, 16], "requests": 2000, "sizes": [1000, 10000, 100000], "repeat": 5},
+}
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def run(profile: str, model_name: str) -> dict:
+    settings = PROFILES[profile]
+    results = {}
+
+    started = time.perf_counter()
+    results["service"] = service_benchmark.run(
+        model_name, settings["train_rows"], settings["concurrency"], settings["requests"],
+        batch_size=64, repeat=settings["repeat"],
+    )
+    results["pipeline"] = pipeline_benchmark.run(settings["sizes"], search="none", cv=3, n_jobs=-1, chunksize=20000)
+    with tempfile.TemporaryDirectory(prefix="optifuel_bench_") as tmp_dir:
+        raw_csv = Path(tmp_dir) / "ship_fuel_efficiency.csv"
+        generate_voyages(settings["train_rows"]).to_csv(raw_csv, index=False)
+        results["feature_transform"] = feature_transform_benchmark.run(raw_csv, 256, settings["repeat"])
+
+    return {
+        "benchmark": "suite",
+        "profile": profile,
+        "environment": _environment(),
+        "total_seconds": time.perf_counter() - started,
+        "results": results,
+    }
+
+
+def flatten(node, prefix: str = "") -> dict:
+    """Числові листки звіту з шляхами на кшталт service.endpoints./predict.concurrency_4.p99_ms."""
+    if isinstance(node, dict):
+        items = node.items()
+    elif isinstance(node, list):
+        # Прогони конвеєра ідентифікуються розміром датасету, а не позицією у списку
+        items = ((f"rows_{item['rows']}" if isinstance(item, dict) and "rows" in item else str(i), item)
+                 for i, item in enumerate(node))
+    else:
+        return {prefix: float(node)} if isinstance(node, (int, float)) and not isinstance(node, bool) else {}
+
+    flat = {}
+    for key, value in items:
+        flat.update(flatten(value, f"{prefix}.{key}" if prefix else str(key)))
+    return flat
+
+
+def _direction(path: str) -> int:
+    """+1 — більше гірше (час), -1 — менше гірше (пропускна здатність), 0 — не порівнюється."""
+    name = path.rsplit(".", 1)[-1]
+    if name.endswith("_ms") or name.endswith("_seconds"):
+        return 1
+    if name == "throughput_rps":
+        return -1
+    return 0
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Список регресій: (шлях, було, стало, відносна зміна)."""
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    regressions = []
+    for path, value in new.items():
+        direction = _direction(path)
+        if direction == 0 or path not in old or old[path] <= 0:
+            continue
+        change = (value - old[path]) / old[path]
+        if direction * change > tolerance:
+            regressions.append((path, old[path], value, change))
+    return sorted(regressions, key=lambda r: -abs(r[3]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the ML benchmark suite and compare against a baseline.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--model", choices=sorted(service_benchmark.MODELS), default="gradient_boosting")
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this file")
+    parser.add_argument("--baseline", type=Path, help="Previous suite report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before failing")
+    args = parser.parse_args()
+
+    report = run(args.profile, args.model)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for path, old, new, change in regressions:
+            print(f"REGRESSION {path}: {old:.4g} -> {new:.4g} ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Бенчмарк ml_service всередині процесу: FastAPI TestClient поверх синтетичних
+артефактів, без мережі та без реального датасету.
+
+Вимірюється:
+  - endpoints: затримка (p50/p90/p99) і пропускна здатність /predict,
+    /predict/batch та /explain за кількох рівнів паралельності клієнтів;
+  - stages: вартість кожного етапу окремо — валідація запиту, кодування
+    ознак (колишній preprocess_input), scaler.transform, model.predict і
+    shap_values, для sklearn-пари scaler + model і для компактного артефакту.
+
+Кеш відповідей вимкнено (кожен запит доходить до моделі), якщо не задано --cache.
+
+Приклад:
+    python benchmarks/service_benchmark.py --concurrency 1 4 16 --output results/service.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR))
+from synthetic import MODELS, build_artifacts, sample_requests
+
+
+def _percentiles(latencies: list) -> dict:
+    ms = np.asarray(latencies) * 1000
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+    }
+
+
+def _load(client, path: str, bodies: list, concurrency: int, n_requests: int) -> dict:
+    """n_requests запитів з concurrency паралельних клієнтів; затримка кожного та загальна пропускна здатність."""
+    def worker(offset: int):
+        latencies = []
+        for i in range(offset, n_requests, concurrency):
+            started = time.perf_counter()
+            response = client.post(path, json=bodies[i % len(bodies)])
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}: {response.text[:200]}")
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = [t for chunk in pool.map(worker, range(concurrency)) for t in chunk]
+    elapsed = time.perf_counter() - started
+    return {"requests": len(latencies), "throughput_rps": len(latencies) / elapsed, **_percentiles(latencies)}
+
+
+def run_endpoints(artifacts_dir: Path, concurrency_levels: list, n_requests: int, batch_size: int, cache: bool) -> dict:
+    # Налаштування сервісу читаються з оточення під час імпорту app.config
+    os.environ["OPTIFUEL_ARTIFACTS_DIR"] = str(artifacts_dir)
+    os.environ["OPTIFUEL_ARTIFACTS_WATCH_INTERVAL_SECONDS"] = "0"
+    if not cache:
+        os.environ["OPTIFUEL_RESPONSE_CACHE_SIZE"] = "0"
+
+    from fastapi.testclient import TestClient
+    from ml_service.app.main import app
+
+    bodies = sample_requests(max(n_requests, 1000))
+    batches = [bodies[i:i + batch_size] for i in range(0, len(bodies) - batch_size + 1, batch_size)]
+    scenarios = {
+        "/predict": (bodies, n_requests),
+        "/predict/batch": (batches, max(n_requests // batch_size, 20)),
+        "/explain": (bodies, max(n_requests // 10, 50)),
+    }
+
+    report = {}
+    with TestClient(app) as client:
+        # Прогрів: SHAP будується ліниво, перший /explain не повинен потрапити у вимір
+        client.post("/explain", json=bodies[0])
+        for path, (path_bodies, count) in scenarios.items():
+            report[path] = {f"concurrency_{c}": _load(client, path, path_bodies, c, count) for c in concurrency_levels}
+    report["/predict/batch"]["batch_size"] = batch_size
+    return report
+
+
+def _best_ms(fn, repeat: int, number: int) -> float:
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number * 1000
+
+
+def run_stages(artifacts_dir: Path, batch_size: int, repeat: int) -> dict:
+    """Вартість кожного етапу обробки запиту окремо, для одного запиту та для батчу."""
+    from ml_service.app.artifacts import build_explainer
+    from ml_service.app.compact_model import CompactModel
+    from ml_service.app.models import PredictionRequest
+    from optifuel_common.encoder import FeatureEncoder
+
+    encoder = FeatureEncoder.load(artifacts_dir)
+    scaler = joblib.load(artifacts_dir / "scaler.joblib")
+    model = joblib.load(artifacts_dir / "best_model.joblib")
+    compact = CompactModel.load(artifacts_dir)
+    explainer = build_explainer(model)
+    compact_explainer = build_explainer(compact)
+
+    bodies = sample_requests(batch_size)
+    report = {}
+    for scenario, payloads, number in (("single", bodies[:1], 200), ("batch", bodies, 10)):
+        requests = [PredictionRequest(**p) for p in payloads]
+        features = encoder.transform_one(requests[0]) if len(requests) == 1 else encoder.transform(requests)
+        scaled = scaler.transform(features)
+        shap_number = max(1, number // 20)
+        report[scenario] = {
+            "rows": len(requests),
+            "validation_ms": _best_ms(lambda: [PredictionRequest(**p) for p in payloads], repeat, number),
+            "preprocess_input_ms": _best_ms(
+                lambda: encoder.transform_one(requests[0]) if len(requests) == 1 else encoder.transform(requests),
+                repeat, number),
+            "sklearn": {
+                "scaler_transform_ms": _best_ms(lambda: scaler.transform(features), repeat, number),
+                "model_predict_ms": _best_ms(lambda: model.predict(scaled), repeat, number),
+                "shap_values_ms": _best_ms(lambda: explainer.shap_values(scaled), repeat, shap_number),
+            },
+            # У компактному артефакті скейлер згорнутий у модель — окремого етапу масштабування немає
+            "compact": {
+                "model_predict_ms": _best_ms(lambda: compact.predict(features), repeat, number),
+                "shap_values_ms": _best_ms(lambda: compact_explainer.shap_values(features), repeat, shap_number),
+            },
+        }
+    return report
+
+
+def run(model_name: str, train_rows: int, concurrency_levels: list, n_requests: int,
+        batch_size: int, repeat: int, cache: bool = False) -> dict:
+    with tempfile.TemporaryDirectory(prefix="optifuel_bench_") as tmp_dir:
+        started = time.perf_counter()
+        artifacts_dir = build_artifacts(Path(tmp_dir), train_rows, model_name)
+        build_seconds = time.perf_counter() - started
+        return {
+            "model": model_name,
+            "train_rows": train_rows,
+            "artifacts_build_seconds": build_seconds,
+            "stages": run_stages(artifacts_dir, batch_size, repeat),
+            "endpoints": run_endpoints(artifacts_dir, concurrency_levels, n_requests, batch_size, cache),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ml_service endpoints and inference stages in-process.")
+    parser.add_argument("--model", choices=sorted(MODELS), default="gradient_boosting")
+    parser.add_argument("--train-rows", type=int, default=5000, help="Rows of synthetic data for the model")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per /predict measurement")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cache", action="store_true", help="Keep the response cache enabled")
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = {
+        "benchmark": "service",
+        "results": run(args.model, args.train_rows, args.concurrency, args.requests,
+                       args.batch_size, args.repeat, args.cache),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text)
+
+
+if __name__ == "__main__":
+    main()
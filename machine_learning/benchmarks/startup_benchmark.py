@@ -0,0 +1,121 @@
+"""
+Бенчмарк холодного старту ml_service.
+
+Запускає сервіс окремим процесом тією ж командою, що й CMD контейнера
+(python -m app.server), і вимірює від моменту запуску процесу:
+  - time_to_ready: /health/ready вперше відповідає 200;
+  - time_to_first_prediction: перший успішний POST /predict;
+  - time_to_explainer_ready: SHAP прогрітий у фоні (explainer_ready = true).
+
+З --workers N master спершу завантажує артефакти, а потім форкає воркерів —
+час до готовності включає і цей preload.
+
+Приклад:
+    python benchmarks/startup_benchmark.py --artifacts artifacts --runs 5 --output results/startup.json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+SAMPLE_REQUEST = {
+    "distance": 250.5,
+    "engine_efficiency": 91.3,
+    "ship_type": "Tanker Ship",
+    "route_id": "Lagos-Apapa",
+    "fuel_type": "Diesel",
+    "weather_conditions": "Stormy",
+    "month": 11,
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _request(url: str, payload=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, None
+    except (urllib.error.URLError, ConnectionError):
+        return None, None
+
+
+def measure_once(artifacts_dir: Path, timeout: float, workers: int = 1) -> dict:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    # Той самий PYTHONPATH, що в образі: пакет app з ml_service, optifuel_common з кореня
+    env = dict(os.environ, OPTIFUEL_ARTIFACTS_DIR=str(artifacts_dir), OPTIFUEL_ARTIFACTS_WATCH_INTERVAL_SECONDS="0",
+               PYTHONPATH=os.pathsep.join([str(BASE_DIR / "ml_service"), str(BASE_DIR)]))
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    result = {}
+    try:
+        deadline = started + timeout
+        while time.perf_counter() < deadline:
+            status, body = _request(f"{base_url}/health/ready")
+            now = time.perf_counter() - started
+            if status == 200:
+                result.setdefault("time_to_ready", now)
+                if "time_to_first_prediction" not in result:
+                    if _request(f"{base_url}/predict", SAMPLE_REQUEST)[0] == 200:
+                        result["time_to_first_prediction"] = time.perf_counter() - started
+                if body.get("explainer_ready"):
+                    result["time_to_explainer_ready"] = now
+                    break
+            time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    if "time_to_first_prediction" not in result:
+        raise RuntimeError(f"Service did not serve a prediction within {timeout}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure ml_service cold-start latency.")
+    parser.add_argument("--artifacts", type=Path, default=BASE_DIR / "artifacts")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes passed to app.server")
+    parser.add_argument("--output", type=Path, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    runs = [measure_once(args.artifacts.resolve(), args.timeout, args.workers) for _ in range(args.runs)]
+    summary = {}
+    for metric in ("time_to_ready", "time_to_first_prediction", "time_to_explainer_ready"):
+        values = [run[metric] for run in runs if metric in run]
+        if values:
+            summary[metric] = {"median": statistics.median(values), "min": min(values), "max": max(values)}
+
+    report = {"benchmark": "startup", "workers": args.workers, "runs": runs, "summary": summary}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text)
+
+
+if __name__ == "__main__":
+    main()
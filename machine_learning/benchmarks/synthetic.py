@@ -0,0 +1,97 @@
+"""
+Синтетичні дані та артефакти для бенчмарків — щоб вони працювали офлайн,
+без реального датасету і без попереднього запуску тренування.
+
+generate_voyages дає сирий журнал рейсів у форматі ship_fuel_efficiency.csv,
+build_artifacts навчає на ньому модель і зберігає повний набір артефактів
+сервісу (joblib-файли, кодувальник, компактний артефакт, маніфест версії).
+"""
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from ml_service.app.compact_model import export_compact_model
+from ml_service.app.versioning import write_version_manifest
+from optifuel_common.encoder import CATEGORY_SCHEMA, MONTH_NUMBERS, WEATHER_MAPPING, FeatureEncoder
+
+MODELS = {
+    "gradient_boosting": lambda: GradientBoostingRegressor(n_estimators=100, random_state=42),
+    "hist_gradient_boosting": lambda: HistGradientBoostingRegressor(max_iter=200, random_state=42),
+    "random_forest": lambda: RandomForestRegressor(n_estimators=100, n_jobs=-1, random_state=42),
+}
+
+# Витрата палива на милю за типом судна та множники палива й погоди
+_SHIP_RATE = {'Fishing Trawler': 18.0, 'Oil Service Boat': 25.0, 'Surfer Boat': 12.0, 'Tanker Ship': 40.0}
+_FUEL_FACTOR = {'Diesel': 1.0, 'HFO': 1.15}
+_WEATHER_FACTOR = {'Calm': 1.0, 'Moderate': 1.1, 'Stormy': 1.25}
+
+
+def generate_voyages(n_rows: int, random_state: int = 42) -> pd.DataFrame:
+    """Сирий журнал рейсів з правдоподібною залежністю споживання від ознак."""
+    rng = np.random.default_rng(random_state)
+    ship_type = rng.choice(CATEGORY_SCHEMA['ship_type'], n_rows)
+    fuel_type = rng.choice(CATEGORY_SCHEMA['fuel_type'], n_rows)
+    weather = rng.choice(list(WEATHER_MAPPING), n_rows)
+    distance = rng.uniform(20, 500, n_rows).round(2)
+    engine_efficiency = rng.uniform(70, 95, n_rows).round(2)
+
+    fuel = (
+        distance
+        * np.vectorize(_SHIP_RATE.get)(ship_type)
+        * np.vectorize(_FUEL_FACTOR.get)(fuel_type)
+        * np.vectorize(_WEATHER_FACTOR.get)(weather)
+        * (85.0 / engine_efficiency)
+        * rng.normal(1.0, 0.05, n_rows)
+    ).round(2)
+
+    return pd.DataFrame({
+        'ship_id': [f"NG{i % 120:03d}" for i in range(n_rows)],
+        'ship_type': ship_type,
+        'route_id': rng.choice(CATEGORY_SCHEMA['route_id'], n_rows),
+        'month': rng.choice(list(MONTH_NUMBERS), n_rows),
+        'distance': distance,
+        'fuel_type': fuel_type,
+        'fuel_consumption': fuel,
+        'CO2_emissions': (fuel * 2.8).round(2),
+        'weather_conditions': weather,
+        'engine_efficiency': engine_efficiency,
+    })
+
+
+def sample_requests(n: int, random_state: int = 0) -> list:
+    """Різні тіла запитів до /predict і /explain (різні ключі кешу)."""
+    df = generate_voyages(n, random_state)
+    df['month'] = df['month'].map(MONTH_NUMBERS)
+    columns = ['distance', 'engine_efficiency', 'ship_type', 'route_id', 'fuel_type', 'weather_conditions', 'month']
+    return df[columns].to_dict(orient='records')
+
+
+def build_artifacts(output_dir: Path, n_rows: int = 5000, model_name: str = "gradient_boosting", compact: bool = True) -> Path:
+    """Навчає модель на синтетичних рейсах і зберігає артефакти так само, як retrain.py."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    df = generate_voyages(n_rows)
+    encoder = FeatureEncoder.from_schema(drop_first=True)
+    X = encoder.transform_frame(df)
+    y = df['fuel_consumption'].to_numpy(dtype=float)
+
+    scaler = StandardScaler()
+    model = MODELS[model_name]()
+    model.fit(scaler.fit_transform(X), y)
+
+    joblib.dump(model, output_dir / "best_model.joblib")
+    joblib.dump(scaler, output_dir / "scaler.joblib")
+    joblib.dump(encoder.feature_order, output_dir / "feature_order.joblib")
+    encoder.save(output_dir)
+    if compact:
+        export_compact_model(model, scaler, encoder.feature_order, output_dir, X_check=X[:1000])
+    write_version_manifest(output_dir)
+    return output_dir
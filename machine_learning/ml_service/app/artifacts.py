@@ -0,0 +1,165 @@
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Optional
+
+import joblib
+import numpy as np
+
+from optifuel_common.encoder import ENCODER_FILE, FeatureEncoder
+
+from .compact_model import CompactModel
+from .metrics import STAGE_SECONDS
+from .versioning import resolve_version
+
+
+class ArtifactsUpdating(RuntimeError):
+    """Файли артефактів саме перезаписуються — завантаження треба повторити пізніше."""
+
+
+@dataclass(frozen=True)
+class ArtifactBundle:
+    """
+    Незмінний узгоджений набір артефактів однієї версії.
+
+    Обробник запиту бере посилання на поточний набір один раз і працює лише
+    з ним, тож заміна набору під час перезавантаження ніколи не змішує
+    модель, скейлер і порядок ознак різних версій.
+    """
+    version: str
+    model: Any
+    scaler: Any
+    feature_order: List[str]
+    encoder: FeatureEncoder
+    explainer: Any = None
+    prediction_table: Any = None
+
+
+def load_artifacts(artifacts_path: Path) -> ArtifactBundle:
+    """
+    Завантажує модель, скейлер, порядок ознак і будує кодувальник.
+
+    Компактний артефакт має пріоритет: у ньому скейлер уже згорнутий у
+    модель, тож sklearn не розпаковується. Інакше — joblib-файли з тренування.
+    Версія перевіряється до і після читання файлів, щоб не прийняти набір,
+    який саме перезаписує retrain.
+    """
+    version = resolve_version(artifacts_path)
+    if version is None:
+        raise ArtifactsUpdating(f"Artifacts in {artifacts_path} do not match their version manifest yet")
+
+    if CompactModel.exists(artifacts_path):
+        model = CompactModel.load(artifacts_path)
+        scaler = None
+        feature_order = model.feature_order
+        logging.info(f"Loaded compact {model.model_name} artifact.")
+    else:
+        model = joblib.load(artifacts_path / "best_model.joblib")
+        scaler = joblib.load(artifacts_path / "scaler.joblib")
+        feature_order = joblib.load(artifacts_path / "feature_order.joblib")
+
+    # Кодувальник, збережений разом з моделлю; без нього (старі артефакти) —
+    # відтворюється з порядку ознак
+    if FeatureEncoder.exists(artifacts_path):
+        encoder = FeatureEncoder.load(artifacts_path)
+        if encoder.feature_order != list(feature_order):
+            raise ValueError(f"{ENCODER_FILE} does not match the model feature order")
+    else:
+        encoder = FeatureEncoder(feature_order)
+
+    if resolve_version(artifacts_path) != version:
+        raise ArtifactsUpdating(f"Artifacts in {artifacts_path} changed while loading")
+
+    return ArtifactBundle(
+        version=version,
+        model=model,
+        scaler=scaler,
+        feature_order=list(feature_order),
+        encoder=encoder,
+        explainer=LazyExplainer(model),
+    )
+
+
+def build_explainer(model):
+    """Будує SHAP TreeExplainer; компактна модель передається у словниковому форматі shap."""
+    # shap (разом із numba) імпортується кілька секунд, тож лише тут, а не на старті сервісу
+    import shap
+
+    return shap.TreeExplainer(model.shap_model() if isinstance(model, CompactModel) else model)
+
+
+class LazyExplainer:
+    """
+    SHAP explainer, що будується при першому використанні або фоновим прогрівом.
+
+    Потокобезпечний: паралельні виклики get() чекають на одну побудову. Помилка
+    побудови запам'ятовується, щоб не повторювати дорогу спробу на кожен запит.
+    """
+
+    def __init__(self, model):
+        self._model = model
+        self._lock = threading.Lock()
+        self._explainer = None
+        self._error: Optional[Exception] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._explainer is not None
+
+    @property
+    def failed(self) -> bool:
+        return self._error is not None
+
+    def get(self):
+        if self._explainer is None:
+            with self._lock:
+                if self._explainer is None and self._error is None:
+                    try:
+                        self._explainer = build_explainer(self._model)
+                        logging.info("SHAP Explainer initialized successfully.")
+                    except Exception as e:
+                        logging.warning(f"Failed to initialize SHAP explainer: {e}")
+                        self._error = e
+        if self._error is not None:
+            raise RuntimeError(f"SHAP explainer unavailable: {self._error}")
+        return self._explainer
+
+    def shap_values(self, features: np.ndarray):
+        return self.get().shap_values(features)
+
+
+def model_input(bundle: ArtifactBundle, features: np.ndarray) -> np.ndarray:
+    """Масштабує ознаки, якщо скейлер не згорнутий у модель."""
+    if bundle.scaler is None:
+        return features
+    with STAGE_SECONDS.time("scaling"):
+        return bundle.scaler.transform(features)
+
+
+def shap_matrix(bundle: ArtifactBundle, features: np.ndarray) -> np.ndarray:
+    """SHAP-значення для матриці ознак одним викликом explainer, форма (n_rows, n_features)."""
+    features = model_input(bundle, features)
+    with STAGE_SECONDS.time("shap"):
+        shap_values = bundle.explainer.shap_values(features)
+
+    values = shap_values[0] if isinstance(shap_values, list) else shap_values
+
+    return np.atleast_2d(values)
+
+
+def predict_values(bundle: ArtifactBundle, requests) -> np.ndarray:
+    """Прогнози для списку запитів: з таблиці, якщо вона ввімкнена, інакше — моделлю."""
+    if bundle.prediction_table is not None:
+        # Готовий прогноз з таблиці замість проходу моделлю
+        with STAGE_SECONDS.time("prediction_table"):
+            return bundle.prediction_table.lookup_many(requests)
+
+    encoder = bundle.encoder
+    with STAGE_SECONDS.time("preprocess_input"):
+        features = encoder.transform_one(requests[0]) if len(requests) == 1 else encoder.transform(requests)
+
+    # Масштабування та прогноз одним викликом на весь батч
+    features = model_input(bundle, features)
+    with STAGE_SECONDS.time("predict"):
+        return bundle.model.predict(features)
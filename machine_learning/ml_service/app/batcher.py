@@ -0,0 +1,84 @@
+import asyncio
+import time
+from typing import Callable, List, Optional, Tuple
+
+from .executor import InferenceLane, InferenceTiming
+from .models import PredictionRequest
+
+
+class MicroBatcher:
+    """
+    Динамічний батчер одиночних запитів /predict.
+
+    Запити, що надійшли протягом вікна max_wait (або поки не набереться
+    max_batch_size), складаються в одну матрицю й проходять один виклик
+    fn(bundle, requests) у смузі інференсу; кожен результат повертається
+    своєму клієнту. Батч завжди належить одному набору артефактів: запит з
+    іншою версією спершу відправляє поточний батч. Уся координація
+    відбувається в event loop, тож блокування не потрібні.
+    """
+
+    def __init__(self, lane: InferenceLane, fn: Callable, max_batch_size: int, max_wait_seconds: float):
+        self.lane = lane
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._pending: List[Tuple[PredictionRequest, float, asyncio.Future]] = []
+        self._pending_bundle = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def submit(self, bundle, request: PredictionRequest) -> Tuple[float, InferenceTiming, int]:
+        """Ставить запит у поточний батч; повертає (прогноз, таймінг, розмір батчу)."""
+        if self._pending and self._pending_bundle is not bundle:
+            self._flush()
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending_bundle = bundle
+        self._pending.append((request, time.perf_counter(), future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_seconds, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._run(self._pending_bundle, batch))
+        # Тримаємо посилання, щоб задачу не зібрав GC до завершення
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, bundle, batch) -> None:
+        try:
+            values, timing = await self.lane.run(self.fn, bundle, [request for request, _, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        finished = time.perf_counter()
+        for (_, submitted, future), value in zip(batch, values):
+            if not future.done():
+                # Очікування клієнта включає і вікно накопичення батчу
+                queue_wait = max(finished - submitted - timing.execution, 0.0)
+                future.set_result((float(value), InferenceTiming(queue_wait, timing.execution), len(batch)))
+
+    def close(self) -> None:
+        """Скасовує запити, що ще чекають на формування батчу."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for _, _, future in self._pending:
+            future.cancel()
+        self._pending = []
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from .models import PredictionRequest
+
+
+class ResponseCache:
+    """
+    Потокобезпечний LRU-кеш відповідей з обмеженням розміру та TTL.
+
+    Ключ — канонізований PredictionRequest: дробові поля округлюються до
+    float_precision знаків, тож однакові специфікації рейсу з різним "шумом"
+    у хвостових розрядах потрапляють в один запис. Кеш очищується щоразу,
+    коли перезавантажуються ML-артефакти.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float, float_precision: int):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.float_precision = float_precision
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def make_key(self, endpoint: str, request: PredictionRequest, *extra: Hashable) -> Tuple:
+        p = self.float_precision
+        return (
+            endpoint,
+            round(request.distance, p),
+            round(request.engine_efficiency, p),
+            request.ship_type,
+            request.route_id,
+            request.fuel_type,
+            request.weather_conditions,
+            request.month,
+        ) + extra
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Явна інвалідація, напр. після перезавантаження артефактів."""
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
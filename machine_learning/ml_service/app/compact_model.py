@@ -0,0 +1,327 @@
+import json
+import logging
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from optifuel_common.atomic import atomic_write
+
+# Компактний артефакт моделі: маніфест (JSON) + один плаский масив вузлів (.npy).
+# Масштабування StandardScaler вже "запечене" у коефіцієнти/пороги, тож
+# сервіс подає на вхід сирі ознаки з FeatureEncoder і не розпаковує sklearn.
+COMPACT_FORMAT_VERSION = 1
+MANIFEST_FILE = "compact_model.json"
+ARRAYS_FILE = "compact_model.npy"
+
+# Допуск звірки з sklearn: згорнутий скейлер змінює порядок операцій з
+# плаваючою комою, тож прогнози збігаються з точністю до округлення, не побітово
+CHECK_RTOL = 1e-6
+CHECK_ATOL = 1e-3
+
+# Вузли всіх дерев ансамблю, записані підряд. Індекси дітей — глобальні.
+# Листок посилається сам на себе з порогом +inf, тож обхід дерева не
+# потребує окремої перевірки на листок.
+NODE_DTYPE = np.dtype([
+    ("feature", "<i4"),
+    ("left", "<i4"),
+    ("right", "<i4"),
+    ("threshold", "<f8"),
+    ("value", "<f8"),
+    ("weight", "<f8"),
+])
+
+
+def _scaler_stats(scaler, n_features: int):
+    """Повертає (mean, scale) скейлера або тотожне перетворення, якщо скейлера немає."""
+    mean = getattr(scaler, "mean_", None) if scaler is not None else None
+    scale = getattr(scaler, "scale_", None) if scaler is not None else None
+    mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+    return mean, scale
+
+
+def _sklearn_tree_nodes(tree) -> dict:
+    """Вузли дерева sklearn (sklearn.tree._tree.Tree) у спільному для експорту вигляді."""
+    return {
+        "is_leaf": tree.children_left < 0,
+        "left": tree.children_left,
+        "right": tree.children_right,
+        "feature": tree.feature,
+        "threshold": _float32_split_bound(tree.threshold),
+        "value": tree.value.reshape(tree.node_count, -1)[:, 0],
+        "weight": tree.weighted_n_node_samples,
+        "max_depth": int(tree.max_depth),
+    }
+
+
+def _hist_predictor_nodes(predictor) -> dict:
+    """
+    Вузли дерева HistGradientBoosting (TreePredictor). Такі дерева порівнюють
+    float64-ознаки з num_threshold напряму, тож поріг переноситься як є.
+    """
+    nodes = predictor.nodes
+    if nodes["is_categorical"].any():
+        raise TypeError("Compact export does not support categorical splits of HistGradientBoosting")
+    return {
+        "is_leaf": nodes["is_leaf"].astype(bool),
+        "left": nodes["left"].astype(np.int64),
+        "right": nodes["right"].astype(np.int64),
+        "feature": nodes["feature_idx"].astype(np.int64),
+        "threshold": nodes["num_threshold"],
+        "value": nodes["value"],
+        "weight": nodes["count"].astype(np.float64),
+        "max_depth": int(nodes["depth"].max()),
+    }
+
+
+def _ensemble_layout(model):
+    """Повертає (вузли кожного дерева, базове значення, множник суми листків) для ансамблю."""
+    if hasattr(model, "_predictors"):
+        # HistGradientBoostingRegressor: baseline + sum(tree); learning_rate уже в значеннях листків
+        base = float(np.ravel(model._baseline_prediction)[0])
+        trees = [_hist_predictor_nodes(predictors[0]) for predictors in model._predictors]
+        return trees, base, 1.0
+    if hasattr(model, "init_") and hasattr(model, "learning_rate"):
+        # GradientBoostingRegressor: init + learning_rate * sum(tree)
+        init = model.init_
+        base = float(np.ravel(init.constant_)[0]) if hasattr(init, "constant_") else 0.0
+        trees = [_sklearn_tree_nodes(est.tree_) for est in np.ravel(model.estimators_)]
+        return trees, base, float(model.learning_rate)
+    if hasattr(model, "estimators_"):
+        # RandomForestRegressor: середнє по деревах
+        trees = [_sklearn_tree_nodes(est.tree_) for est in model.estimators_]
+        return trees, 0.0, 1.0 / len(trees)
+    if hasattr(model, "tree_"):
+        return [_sklearn_tree_nodes(model.tree_)], 0.0, 1.0
+    raise TypeError(f"Unsupported model type for compact export: {type(model).__name__}")
+
+
+def _float32_split_bound(threshold: np.ndarray) -> np.ndarray:
+    """
+    Переводить поріг sklearn у еквівалентний поріг для float64-входу.
+
+    Дерева sklearn порівнюють float32(x) <= t, тому рядок, що точно дорівнює
+    навчальному значенню, може лежати на самому порозі. Повертаємо середину між
+    найбільшим float32 <= t та наступним float32 — межу округлення, до якої
+    float64-значення ще потрапляє ліворуч.
+    """
+    t32 = threshold.astype(np.float32)
+    floor32 = np.where(t32 > threshold, np.nextafter(t32, np.float32(-np.inf)), t32)
+    next32 = np.nextafter(floor32, np.float32(np.inf))
+    return (floor32.astype(np.float64) + next32.astype(np.float64)) / 2
+
+
+def _fold_threshold(threshold: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """
+    Переносить поріг з масштабованого простору в сирі ознаки: найбільше
+    float64 x, для якого (x - mean) / scale <= threshold — саме так рахує
+    StandardScaler. Наївне threshold * scale + mean може відрізнятися на
+    кілька ULP, і рядок, що лежить точно на порозі, пішов би не в ту гілку.
+    """
+    raw = threshold * scale + mean
+    for _ in range(64):
+        too_high = (raw - mean) / scale > threshold
+        up = np.nextafter(raw, np.inf)
+        can_raise = ~too_high & ((up - mean) / scale <= threshold)
+        if not (too_high.any() or can_raise.any()):
+            break
+        raw = np.where(too_high, np.nextafter(raw, -np.inf), np.where(can_raise, up, raw))
+    return raw
+
+
+def _flatten_trees(trees, mean: np.ndarray, scale: np.ndarray):
+    """Склеює дерева у плаский масив вузлів, переносячи масштабування у пороги."""
+    total = sum(len(t["is_leaf"]) for t in trees)
+    nodes = np.zeros(total, dtype=NODE_DTYPE)
+    offsets = []
+    max_depth = 0
+
+    offset = 0
+    for tree in trees:
+        is_leaf = tree["is_leaf"]
+        n = len(is_leaf)
+        local = np.arange(n, dtype=np.int64)
+        feature = np.where(is_leaf, 0, tree["feature"])
+
+        block = nodes[offset:offset + n]
+        block["feature"] = feature
+        block["left"] = np.where(is_leaf, local, tree["left"]) + offset
+        block["right"] = np.where(is_leaf, local, tree["right"]) + offset
+        # x_scaled <= t  <=>  x <= t * scale + mean (з точністю до ULP, див. _fold_threshold)
+        threshold = np.where(is_leaf, 0.0, tree["threshold"])
+        block["threshold"] = np.where(is_leaf, np.inf, _fold_threshold(threshold, mean[feature], scale[feature]))
+        block["value"] = tree["value"]
+        block["weight"] = tree["weight"]
+
+        offsets.append(offset)
+        max_depth = max(max_depth, tree["max_depth"])
+        offset += n
+
+    return nodes, offsets, max_depth
+
+
+def _check_export(model, scaler, manifest_path: str, arrays_path: str, X_check: np.ndarray) -> None:
+    """Звіряє артефакт із записаних файлів з оригінальною парою scaler + model; ValueError при розбіжності."""
+    with open(manifest_path, encoding="utf-8") as f:
+        compact = CompactModel(json.load(f), np.load(arrays_path, allow_pickle=False))
+
+    X_check = np.asarray(X_check, dtype=np.float64)
+    X_scaled = X_check
+    if scaler is not None:
+        if hasattr(scaler, "feature_names_in_"):
+            # Скейлер, навчений на DataFrame, без назв колонок попереджає на кожному виклику
+            import pandas as pd
+            X_scaled = scaler.transform(pd.DataFrame(X_check, columns=scaler.feature_names_in_))
+        else:
+            X_scaled = scaler.transform(X_check)
+    expected = model.predict(X_scaled)
+    actual = compact.predict(X_check)
+
+    max_err = float(np.max(np.abs(expected - actual))) if len(expected) else 0.0
+    logging.info(f"Compact model check: max abs deviation {max_err:.6g} on {len(expected)} rows.")
+    if not np.allclose(expected, actual, rtol=CHECK_RTOL, atol=CHECK_ATOL):
+        raise ValueError(f"Compact model deviates from the original pipeline (max abs error {max_err:.6g}); export aborted")
+
+
+def export_compact_model(model, scaler, feature_order: Sequence[str], output_dir: Path,
+                         X_check: Optional[np.ndarray] = None) -> Path:
+    """
+    Експортує навчену модель разом зі скейлером у компактний артефакт.
+
+    Для лінійних моделей mean/scale згортаються у коефіцієнти, для деревних
+    ансамблів — у пороги розбиття. Якщо передано X_check (сирі, немасштабовані
+    ознаки), прогнози артефакту звіряються з оригінальною парою scaler + model
+    ще до підміни файлів; при розбіжності — ValueError, а попередній артефакт
+    лишається на місці.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    feature_order = list(feature_order)
+    mean, scale = _scaler_stats(scaler, len(feature_order))
+
+    manifest = {
+        "format_version": COMPACT_FORMAT_VERSION,
+        "model_name": type(model).__name__,
+        "feature_order": feature_order,
+        "arrays": ARRAYS_FILE,
+    }
+
+    if hasattr(model, "coef_"):
+        coef = np.ravel(model.coef_).astype(np.float64)
+        folded = coef / scale
+        intercept = float(np.ravel(model.intercept_)[0]) - float(np.dot(coef, mean / scale))
+        arrays = folded
+        manifest.update(kind="linear", intercept=intercept)
+    else:
+        trees, base, tree_scale = _ensemble_layout(model)
+        arrays, offsets, max_depth = _flatten_trees(trees, mean, scale)
+        manifest.update(
+            kind="tree_ensemble",
+            base_value=base,
+            tree_scale=tree_scale,
+            tree_offsets=offsets,
+            max_depth=max_depth,
+        )
+
+    # Масив підміняється першим, маніфест — за ним. Перевірка читає вже
+    # записані тимчасові файли і при розбіжності перериває експорт до підміни:
+    # сервіс завжди віддає перевагу компактному артефакту, тож хибно згорнутий
+    # скейлер не повинен потрапити на диск
+    with atomic_write(output_dir / MANIFEST_FILE) as manifest_file, \
+            atomic_write(output_dir / ARRAYS_FILE, "wb") as arrays_file:
+        json.dump(manifest, manifest_file, ensure_ascii=False, indent=2)
+        np.save(arrays_file, arrays, allow_pickle=False)
+        if X_check is not None:
+            manifest_file.flush()
+            arrays_file.flush()
+            _check_export(model, scaler, manifest_file.name, arrays_file.name, X_check)
+
+    return output_dir / MANIFEST_FILE
+
+
+class CompactModel:
+    """
+    Модель, завантажена з компактного артефакту без sklearn.
+
+    Масив вузлів відкривається через mmap (режим лише для читання), тож
+    кілька процесів-воркерів ділять одні й ті самі сторінки пам'яті.
+    Приймає сирі ознаки у порядку feature_order — скейлер уже врахований.
+    """
+
+    def __init__(self, manifest: dict, arrays: np.ndarray):
+        self.manifest = manifest
+        self.kind = manifest["kind"]
+        self.model_name = manifest.get("model_name", "")
+        self.feature_order = list(manifest["feature_order"])
+        self.arrays = arrays
+
+        if self.kind == "tree_ensemble":
+            self.base_value = float(manifest["base_value"])
+            self.tree_scale = float(manifest["tree_scale"])
+            self.max_depth = int(manifest["max_depth"])
+            self.roots = np.asarray(manifest["tree_offsets"], dtype=np.intp)
+            self._feature = arrays["feature"]
+            self._left = arrays["left"]
+            self._right = arrays["right"]
+            self._threshold = arrays["threshold"]
+            self._value = arrays["value"]
+        elif self.kind == "linear":
+            self.intercept = float(manifest["intercept"])
+        else:
+            raise ValueError(f"Unknown compact model kind: {self.kind}")
+
+    @classmethod
+    def load(cls, artifacts_dir: Path, mmap: bool = True) -> "CompactModel":
+        artifacts_dir = Path(artifacts_dir)
+        with open(artifacts_dir / MANIFEST_FILE, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != COMPACT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported compact model format: {manifest.get('format_version')}")
+        arrays = np.load(artifacts_dir / manifest["arrays"], mmap_mode="r" if mmap else None, allow_pickle=False)
+        return cls(manifest, arrays)
+
+    @staticmethod
+    def exists(artifacts_dir: Path) -> bool:
+        return (Path(artifacts_dir) / MANIFEST_FILE).exists()
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        if self.kind == "linear":
+            return X @ self.arrays + self.intercept
+        return self.base_value + self.tree_scale * self.leaf_values(X).sum(axis=1)
+
+    def leaf_values(self, X: np.ndarray, roots: Optional[np.ndarray] = None) -> np.ndarray:
+        """Значення листків кожного дерева (або лише дерев з roots) для кожного рядка, форма (n_rows, n_trees)."""
+        X = np.asarray(X, dtype=np.float64)
+        roots = self.roots if roots is None else roots
+        rows = np.arange(X.shape[0])[:, None]
+        idx = np.broadcast_to(roots, (X.shape[0], len(roots)))
+        # Усі дерева проходяться одночасно; листки зациклені самі на себе
+        for _ in range(self.max_depth):
+            go_left = X[rows, self._feature[idx]] <= self._threshold[idx]
+            idx = np.where(go_left, self._left[idx], self._right[idx])
+        return self._value[idx]
+
+    def shap_model(self) -> dict:
+        """Опис ансамблю у словниковому форматі shap.TreeExplainer (пороги — у сирих ознаках)."""
+        if self.kind != "tree_ensemble":
+            raise TypeError("SHAP tree explanations require a tree ensemble model")
+        bounds = list(self.roots) + [len(self.arrays)]
+        trees = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            block = self.arrays[start:end]
+            local = np.arange(end - start)
+            is_leaf = block["left"] - start == local
+            left = np.where(is_leaf, -1, block["left"] - start)
+            right = np.where(is_leaf, -1, block["right"] - start)
+            trees.append({
+                "children_left": left,
+                "children_right": right,
+                "children_default": left,
+                "features": np.where(is_leaf, -2, block["feature"]),
+                "thresholds": np.where(is_leaf, -2.0, block["threshold"]),
+                "values": (block["value"] * self.tree_scale).reshape(-1, 1),
+                "node_sample_weight": np.array(block["weight"]),
+            })
+        return {"trees": trees, "base_offset": self.base_value}
@@ -0,0 +1,67 @@
+import os
+from pathlib import Path
+
+# Налаштування ML-сервісу, що зчитуються зі змінних оточення контейнера.
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+# --- Артефакти моделі та їх гаряче перезавантаження ---
+ARTIFACTS_DIR = Path(os.environ.get("OPTIFUEL_ARTIFACTS_DIR", "/app/artifacts"))
+# Як часто перевіряти маніфест версії на диску (0 вимикає спостереження)
+ARTIFACTS_WATCH_INTERVAL_SECONDS = _env_float("OPTIFUEL_ARTIFACTS_WATCH_INTERVAL_SECONDS", 30.0)
+# /admin/* вимагає заголовок X-Admin-Token з цим значенням; без токена
+# адмін-ендпоінти вимкнені (404)
+ADMIN_TOKEN = os.environ.get("OPTIFUEL_ADMIN_TOKEN", "")
+
+# --- Кількість процесів-воркерів сервісу (python -m app.server) ---
+# Воркери форкаються від master-процесу, який уже завантажив модель і SHAP
+# explainer, тож ділять одну копію в пам'яті замість N копій. Пули інференсу
+# (PREDICT_WORKERS, EXPLAIN_WORKERS) і черги нижче діють окремо в кожному воркері.
+WORKERS = _env_int("OPTIFUEL_WORKERS", 1)
+
+# --- Таблиця попередньо обчислених прогнозів ---
+PREDICTION_TABLE_ENABLED = _env_bool("OPTIFUEL_PREDICTION_TABLE", False)
+PREDICTION_TABLE_MAX_CELLS = _env_int("OPTIFUEL_PREDICTION_TABLE_MAX_CELLS", 8_000_000)
+PREDICTION_TABLE_CHECK_SAMPLES = _env_int("OPTIFUEL_PREDICTION_TABLE_CHECK_SAMPLES", 2000)
+
+# --- Кеш відповідей /predict та /explain (розмір 0 вимикає кеш) ---
+RESPONSE_CACHE_SIZE = _env_int("OPTIFUEL_RESPONSE_CACHE_SIZE", 10_000)
+RESPONSE_CACHE_TTL_SECONDS = _env_int("OPTIFUEL_RESPONSE_CACHE_TTL_SECONDS", 3600)
+RESPONSE_CACHE_FLOAT_PRECISION = _env_int("OPTIFUEL_RESPONSE_CACHE_FLOAT_PRECISION", 6)
+
+# --- Пули інференсу: окремі ліміти паралельності та черги для /predict і /explain ---
+PREDICT_WORKERS = _env_int("OPTIFUEL_PREDICT_WORKERS", min(4, os.cpu_count() or 1))
+PREDICT_MAX_QUEUE = _env_int("OPTIFUEL_PREDICT_MAX_QUEUE", 256)
+EXPLAIN_WORKERS = _env_int("OPTIFUEL_EXPLAIN_WORKERS", 2)
+EXPLAIN_MAX_QUEUE = _env_int("OPTIFUEL_EXPLAIN_MAX_QUEUE", 32)
+EXPLAIN_PROCESS_POOL = _env_bool("OPTIFUEL_EXPLAIN_PROCESS_POOL", False)
+
+# --- Максимум елементів у /predict/batch і /explain/batch (більший батч — 422) ---
+PREDICT_BATCH_MAX_ITEMS = _env_int("OPTIFUEL_PREDICT_BATCH_MAX_ITEMS", 10_000)
+# SHAP на порядки дорожчий за прогноз, тож і ліміт менший
+EXPLAIN_BATCH_MAX_ITEMS = _env_int("OPTIFUEL_EXPLAIN_BATCH_MAX_ITEMS", 1_000)
+
+# --- Мікробатчинг одиночних /predict (вимкнено за замовчуванням) ---
+MICRO_BATCH_ENABLED = _env_bool("OPTIFUEL_MICRO_BATCH", False)
+MICRO_BATCH_MAX_SIZE = _env_int("OPTIFUEL_MICRO_BATCH_MAX_SIZE", 64)
+MICRO_BATCH_MAX_WAIT_MS = _env_float("OPTIFUEL_MICRO_BATCH_MAX_WAIT_MS", 2.0)
+
+# --- Семплювальний профайлер (/admin/profile), вимкнено за замовчуванням ---
+PROFILER_ENABLED = _env_bool("OPTIFUEL_PROFILER_ENABLED", False)
+PROFILER_MAX_SECONDS = _env_float("OPTIFUEL_PROFILER_MAX_SECONDS", 60.0)
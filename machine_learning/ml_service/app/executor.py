@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from .artifacts import load_artifacts, shap_matrix
+
+
+class InferenceQueueFull(Exception):
+    """Черга смуги інференсу переповнена — запит відхиляється одразу."""
+
+    def __init__(self, lane: str):
+        super().__init__(f"Inference queue '{lane}' is full")
+        self.lane = lane
+
+
+class InferenceWorkersLost(Exception):
+    """Пул смуги зламався (воркер упав або не стартував); пул уже перестворено, запит можна повторити."""
+
+    def __init__(self, lane: str):
+        super().__init__(f"Inference workers of '{lane}' were lost; the pool has been restarted")
+        self.lane = lane
+
+
+@dataclass
+class InferenceTiming:
+    queue_wait: float
+    execution: float
+
+
+def _timed_call(fn: Callable, *args) -> tuple:
+    """Виконує fn у воркері та повертає (результат, час виконання)."""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+class InferenceLane:
+    """
+    Окремий пул для одного типу роботи (/predict або /explain).
+
+    Паралельність обмежена кількістю воркерів пулу, а глибина черги —
+    max_queue: коли зайняті всі воркери і черга повна, run() одразу кидає
+    InferenceQueueFull замість того, щоб затримка росла без меж. Лічильник
+    змінюється лише з event loop, тож блокування не потрібне.
+
+    Якщо передано executor_factory, зламаний пул (BrokenExecutor: воркер
+    убито OOM killer'ом, ініціалізатор упав) замінюється новим з фабрики,
+    а запит отримує InferenceWorkersLost замість вічно зламаної смуги.
+    """
+
+    def __init__(self, name: str, executor: Executor, max_workers: int, max_queue: int,
+                 executor_factory: Optional[Callable[[], Executor]] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = executor
+        self._executor_factory = executor_factory
+        self._pending = 0
+
+    @classmethod
+    def threaded(cls, name: str, max_workers: int, max_queue: int) -> "InferenceLane":
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"inference-{name}")
+        return cls(name, executor, max_workers, max_queue)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, fn: Callable, *args) -> tuple:
+        """Виконує fn(*args) у пулі; повертає (результат, InferenceTiming)."""
+        if self._pending >= self.max_workers + self.max_queue:
+            raise InferenceQueueFull(self.name)
+
+        self._pending += 1
+        submitted = time.perf_counter()
+        executor = self._executor
+        try:
+            loop = asyncio.get_running_loop()
+            result, execution = await loop.run_in_executor(executor, _timed_call, fn, *args)
+        except BrokenExecutor:
+            if self._executor_factory is None:
+                raise
+            self._replace_broken(executor)
+            raise InferenceWorkersLost(self.name)
+        finally:
+            self._pending -= 1
+
+        total = time.perf_counter() - submitted
+        return result, InferenceTiming(queue_wait=max(total - execution, 0.0), execution=execution)
+
+    def _replace_broken(self, executor: Executor) -> None:
+        # Усі задачі зламаного пулу падають разом — пул замінює лише перша з них
+        if self._executor is not executor:
+            return
+        logging.warning(f"Inference pool '{self.name}' is broken; starting a new one.")
+        self._executor = self._executor_factory()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self, cancel_pending: bool = True) -> None:
+        """Зупиняє пул; з cancel_pending=False задачі, що вже в черзі, доробляються."""
+        self._executor.shutdown(wait=False, cancel_futures=cancel_pending)
+
+
+# --- Процесний пул для SHAP: кожен процес тримає власні артефакти та explainer ---
+_worker_bundle: Any = None
+
+
+def _explain_worker_init(artifacts_path: str, expected_version: str) -> None:
+    global _worker_bundle
+    bundle = load_artifacts(Path(artifacts_path))
+    # Між активацією версії в основному процесі і стартом воркера retrain міг
+    # записати нові артефакти: воркер не повинен пояснювати іншу модель
+    if bundle.version != expected_version:
+        raise RuntimeError(f"Explain worker loaded artifacts version {bundle.version}, expected {expected_version}")
+    _worker_bundle = bundle
+    # Explainer будується одразу при старті воркера, а не на першому запиті
+    _worker_bundle.explainer.get()
+
+
+def explain_in_worker(features: np.ndarray) -> np.ndarray:
+    """SHAP-матриця, порахована у процесі-воркері (обходить GIL основного процесу)."""
+    return shap_matrix(_worker_bundle, features)
+
+
+def process_explain_lane(artifacts_path: Path, version: str, max_workers: int, max_queue: int) -> InferenceLane:
+    """Смуга /explain у процесному пулі, воркери якого тримають артефакти саме версії version."""
+    def create_executor() -> ProcessPoolExecutor:
+        # spawn, а не fork: основний процес має потоки (event loop, пули,
+        # спостерігач артефактів), і форк посеред їхньої роботи може
+        # успадкувати захоплені блокування
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_explain_worker_init,
+            initargs=(str(artifacts_path), version),
+        )
+
+    return InferenceLane("explain", create_executor(), max_workers, max_queue, executor_factory=create_executor)
@@ -1,137 +1,644 @@
+import asyncio
+import hmac
 import logging
-import joblib
+import time
+from dataclasses import replace
 from pathlib import Path
 import numpy as np
-import pandas as pd
-from fastapi import FastAPI, HTTPException
+from fastapi import Body, FastAPI, Header, HTTPException, Query, Response
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
-import shap
+from typing import List, Optional
 
 # Імпортуємо моделі з локального модуля
 from .models import PredictionRequest, PredictionResponse
+from .artifacts import (
+    ArtifactBundle, ArtifactsUpdating, load_artifacts, predict_values, shap_matrix,
+)
+from .executor import (
+    InferenceLane, InferenceQueueFull, InferenceTiming, InferenceWorkersLost, explain_in_worker, process_explain_lane,
+)
+from .batcher import MicroBatcher
+from .prediction_table import PredictionTable
+from .cache import ResponseCache
+from .versioning import VERSION_FILE, resolve_version
+from .profiler import ProfilerBusy, SamplingProfiler
+from .serialization import BINARY_MEDIA_TYPE, FastJSONResponse, accepts_binary, binary_response, json_response
+from . import config, metrics
 
 # --- Logging Configuration ---
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# --- Словник для зберігання ML артефактів ---
-ml_artifacts = {}
-explainer = None
+# --- Поточний набір ML артефактів (замінюється атомарно при перезавантаженні) ---
+active_artifacts: Optional[ArtifactBundle] = None
+# Створюється в lifespan, уже всередині event loop: на Python 3.9 asyncio.Lock()
+# прив'язується до циклу в момент створення, а не першого використання
+_reload_lock: Optional[asyncio.Lock] = None
+# Версія, для якої SHAP уже прогрітий (shap імпортований, explainer побудований)
+explainer_warm_version: Optional[str] = None
+_background_tasks = set()
+
+# --- Кеш відповідей; ключ містить версію моделі ---
+response_cache = ResponseCache(
+    maxsize=config.RESPONSE_CACHE_SIZE,
+    ttl_seconds=config.RESPONSE_CACHE_TTL_SECONDS,
+    float_precision=config.RESPONSE_CACHE_FLOAT_PRECISION,
+)
+
+# --- Окремі пули інференсу для /predict та /explain ---
+inference_lanes = {}
+predict_batcher = None
+
+# --- Семплювальний профайлер, що вмикається через /admin/profile ---
+profiler = SamplingProfiler()
+
+# Набір, завантажений у master-процесі до fork (див. app.server); воркери
+# успадковують його сторінки пам'яті copy-on-write замість власного завантаження
+preloaded_artifacts: Optional[ArtifactBundle] = None
+_preloaded_manifest_mtime: Optional[int] = None
+
+# Запит для прогріву нової моделі перед тим, як вона почне приймати трафік
+WARM_UP_REQUEST = PredictionRequest(**PredictionRequest.model_config["json_schema_extra"]["example"])
+
+
+def _build_prediction_table(bundle: ArtifactBundle) -> Optional[PredictionTable]:
+    """Будує таблицю прогнозів і вмикає її лише після звірки з живою моделлю."""
+    table = PredictionTable.build(bundle.model, bundle.encoder, config.PREDICTION_TABLE_MAX_CELLS)
+    if table is None:
+        return None
+
+    # Таблиця точна за побудовою, тож будь-яке відхилення означає помилку
+    max_error = table.verify(bundle.model, bundle.encoder, config.PREDICTION_TABLE_CHECK_SAMPLES)
+    if max_error > 1e-6:
+        logging.error(f"Prediction table disagrees with the live model (max abs error {max_error:.6g}); table disabled.")
+        return None
+
+    logging.info(f"Prediction table enabled (max abs error {max_error:.3g} on {config.PREDICTION_TABLE_CHECK_SAMPLES} samples).")
+    return table
+
+
+def _prepare_artifacts(artifacts_path: Path) -> ArtifactBundle:
+    """
+    Завантажує та прогріває новий набір артефактів. Виконується поза event loop;
+    поточний набір продовжує обслуговувати запити, доки цей не буде готовий.
+    """
+    bundle = load_artifacts(artifacts_path)
+    if config.PREDICTION_TABLE_ENABLED:
+        bundle = replace(bundle, prediction_table=_build_prediction_table(bundle))
+
+    # Прогрів: перший виклик моделі не повинен припасти на клієнта.
+    # SHAP прогрівається окремо у фоні — див. _warm_up_explainer.
+    predict_values(bundle, [WARM_UP_REQUEST])
+
+    logging.info(f"ML artifacts version {bundle.version} loaded successfully.")
+    return bundle
+
+
+def _activate(bundle: ArtifactBundle) -> None:
+    """Атомарно робить набір поточним; запити, що вже виконуються, дороблять на старому."""
+    global active_artifacts
+    previous = active_artifacts
+    active_artifacts = bundle
+    response_cache.clear()
+
+    if config.EXPLAIN_PROCESS_POOL:
+        # Воркери процесного пулу тримають власну копію моделі — пул створюється
+        # під кожну активовану версію і відмовляється стартувати з іншою
+        old_lane = inference_lanes.get("explain")
+        inference_lanes["explain"] = process_explain_lane(
+            config.ARTIFACTS_DIR, bundle.version, config.EXPLAIN_WORKERS, config.EXPLAIN_MAX_QUEUE
+        )
+        if old_lane is not None:
+            old_lane.shutdown(cancel_pending=False)
+
+    if previous is not None:
+        logging.info(f"Switched model version {previous.version} -> {bundle.version}.")
+
+    _spawn(_warm_up_explainer(bundle))
+
+
+def _spawn(coro) -> None:
+    task = asyncio.ensure_future(coro)
+    # Тримаємо посилання, щоб задачу не зібрав GC до завершення
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _warm_up_explainer(bundle: ArtifactBundle) -> None:
+    """
+    Фоновий прогрів SHAP: імпорт shap, побудова explainer і перший виклик
+    займають секунди, тож виконуються вже після того, як сервіс приймає
+    /predict. Запит /explain, що прийде раніше, дочекається тієї ж побудови.
+    """
+    global explainer_warm_version
+    started = time.perf_counter()
+    if bundle is preloaded_artifacts and bundle.explainer.ready and not config.EXPLAIN_PROCESS_POOL:
+        # Master уже побудував і викликав explainer до fork — рахувати вдруге нічого
+        explainer_warm_version = bundle.version
+        return
+    try:
+        await _explain_matrix(bundle, bundle.encoder.transform_one(WARM_UP_REQUEST), Response())
+    except Exception as e:
+        logging.warning(f"Explainer warm-up failed for version {bundle.version}: {e}")
+        return
+    explainer_warm_version = bundle.version
+    logging.info(f"Explainer for version {bundle.version} warmed up in {time.perf_counter() - started:.2f}s.")
+
+
+def preload_artifacts() -> Optional[ArtifactBundle]:
+    """
+    Завантажує артефакти і будує SHAP explainer у master-процесі перед fork.
+    Виконується без event loop і без пулів потоків: OpenMP/BLAS обмежені
+    одним потоком, щоб у процесі не лишилося потоків, які fork не переживають.
+    """
+    global preloaded_artifacts, _preloaded_manifest_mtime
+    from threadpoolctl import threadpool_limits
+
+    manifest_mtime = _manifest_mtime()
+    with threadpool_limits(limits=1):
+        try:
+            bundle = _prepare_artifacts(config.ARTIFACTS_DIR)
+        except (FileNotFoundError, ArtifactsUpdating) as e:
+            logging.error(f"Artifact preloading error: {e}. Workers will load artifacts themselves.")
+            return None
+        try:
+            shap_matrix(bundle, bundle.encoder.transform_one(WARM_UP_REQUEST))
+        except Exception as e:
+            logging.warning(f"Explainer preloading failed for version {bundle.version}: {e}")
+
+    preloaded_artifacts = bundle
+    _preloaded_manifest_mtime = manifest_mtime
+    return bundle
+
+
+def _manifest_mtime() -> Optional[int]:
+    try:
+        return (config.ARTIFACTS_DIR / VERSION_FILE).stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _startup_artifacts() -> ArtifactBundle:
+    """
+    Набір для старту воркера: успадкований від master, якщо маніфест версії
+    не змінився після завантаження. Повний перерахунок хешів тут не потрібен —
+    його однаково зробить перша перевірка _watch_artifacts.
+    """
+    bundle = preloaded_artifacts
+    if bundle is not None and _manifest_mtime() == _preloaded_manifest_mtime:
+        logging.info(f"Using preloaded ML artifacts version {bundle.version}.")
+        return bundle
+    return _prepare_artifacts(config.ARTIFACTS_DIR)
+
+
+async def reload_artifacts(force: bool = False) -> bool:
+    """
+    Завантажує нову версію у фоні та підміняє поточну. Повертає False, якщо
+    версія на диску вже активна (і force не задано).
+
+    Запити, що ще виконуються на старому наборі, читають його компактний масив
+    через mmap; це безпечно, бо експорт підміняє файли через os.replace (новий
+    inode), а не переписує той, що відображений.
+    """
+    global _reload_lock
+    if _reload_lock is None:
+        _reload_lock = asyncio.Lock()
+    async with _reload_lock:
+        loop = asyncio.get_running_loop()
+        if not force and active_artifacts is not None:
+            version = await loop.run_in_executor(None, resolve_version, config.ARTIFACTS_DIR)
+            if version == active_artifacts.version:
+                return False
+
+        bundle = await loop.run_in_executor(None, _prepare_artifacts, config.ARTIFACTS_DIR)
+        _activate(bundle)
+        return True
+
+
+async def _watch_artifacts() -> None:
+    """Стежить за маніфестом версії і перезавантажує модель, коли він змінюється."""
+    manifest_path = config.ARTIFACTS_DIR / VERSION_FILE
+    last_seen = None
+    while True:
+        await asyncio.sleep(config.ARTIFACTS_WATCH_INTERVAL_SECONDS)
+        try:
+            mtime = manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            continue
+        if mtime == last_seen:
+            continue
+
+        try:
+            if await reload_artifacts():
+                logging.info("Artifacts reloaded after version manifest change.")
+            last_seen = mtime
+        except ArtifactsUpdating as e:
+            logging.info(f"Artifact reload postponed: {e}")
+        except Exception as e:
+            logging.error(f"Artifact reload failed: {e}", exc_info=True)
+            last_seen = mtime
 
 # --- Lifespan Manager для завантаження ресурсів ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global explainer
+    global predict_batcher, _reload_lock
     # Код, що виконується на старті застосунку
     logging.info("Application startup: Loading ML artifacts...")
-    
-    artifacts_path = Path("/app/artifacts")
-    
-    try:
-        ml_artifacts["model"] = joblib.load(artifacts_path / "best_model.joblib")
-        ml_artifacts["scaler"] = joblib.load(artifacts_path / "scaler.joblib")
-        ml_artifacts["feature_order"] = joblib.load(artifacts_path / "feature_order.joblib")
-        logging.info("ML artifacts loaded successfully.")
+    started = time.perf_counter()
+    response_cache.clear()
+    _reload_lock = asyncio.Lock()
 
-        try:
-            explainer = shap.TreeExplainer(ml_artifacts["model"])
-            logging.info("SHAP Explainer initialized successfully.")
-        except Exception as e:
-            logging.warning(f"Failed to initialize SHAP explainer: {e}")
-    except FileNotFoundError as e:
+    inference_lanes["predict"] = InferenceLane.threaded("predict", config.PREDICT_WORKERS, config.PREDICT_MAX_QUEUE)
+    # Процесна смуга /explain створюється в _activate — під версію завантажених артефактів
+    if not config.EXPLAIN_PROCESS_POOL:
+        inference_lanes["explain"] = InferenceLane.threaded("explain", config.EXPLAIN_WORKERS, config.EXPLAIN_MAX_QUEUE)
+
+    try:
+        _activate(_startup_artifacts())
+    except (FileNotFoundError, ArtifactsUpdating) as e:
         logging.error(f"Artifact loading error: {e}. Run the training pipeline first.")
-    
+
+    if config.MICRO_BATCH_ENABLED:
+        predict_batcher = MicroBatcher(
+            inference_lanes["predict"], predict_values,
+            max_batch_size=config.MICRO_BATCH_MAX_SIZE,
+            max_wait_seconds=config.MICRO_BATCH_MAX_WAIT_MS / 1000,
+        )
+        logging.info(f"Micro-batching enabled: up to {config.MICRO_BATCH_MAX_SIZE} requests or {config.MICRO_BATCH_MAX_WAIT_MS} ms.")
+
+    watcher = None
+    if config.ARTIFACTS_WATCH_INTERVAL_SECONDS > 0:
+        watcher = asyncio.create_task(_watch_artifacts())
+
+    if active_artifacts is not None:
+        logging.info(f"Service ready in {time.perf_counter() - started:.3f}s (model version {active_artifacts.version}).")
+
     yield
-    
+
     # Код, що виконується при зупинці застосунку
     logging.info("Application shutdown: Clearing ML artifacts...")
-    ml_artifacts.clear()
+    if watcher is not None:
+        watcher.cancel()
+    for task in list(_background_tasks):
+        task.cancel()
+    if predict_batcher is not None:
+        predict_batcher.close()
+        predict_batcher = None
+    for lane in inference_lanes.values():
+        lane.shutdown()
+    inference_lanes.clear()
+    _clear_artifacts()
+
+
+def _clear_artifacts() -> None:
+    global active_artifacts
+    active_artifacts = None
+    response_cache.clear()
 
 # --- FastAPI App Initialization ---
 app = FastAPI(
     title="OptiFuel: Ship Fuel Consumption API",
     description="An intelligent system to predict fuel consumption for maritime vessels.",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
+# Лічильники запитів, затримка та запити в обробці для /metrics
+app.add_middleware(metrics.MetricsMiddleware)
 
-def preprocess_input(data: pd.DataFrame, feature_order: list) -> pd.DataFrame:
+
+def _require_artifacts(response: Response) -> ArtifactBundle:
+    """Поточний набір артефактів для запиту; його версія повертається у X-Model-Version."""
+    bundle = active_artifacts
+    if bundle is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Service Unavailable: ML artifacts not loaded. Check application logs."
+        )
+    metrics.observe_validation()
+    response.headers["X-Model-Version"] = bundle.version
+    return bundle
+
+
+def _overloaded(lane_name: str) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"Service overloaded: '{lane_name}' queue is full. Retry later.",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _record_timing(lane_name: str, response: Response, timing: InferenceTiming) -> None:
+    """Час очікування та виконання — у заголовки відповіді та гістограму черги смуги."""
+    response.headers["X-Queue-Wait-Ms"] = f"{timing.queue_wait * 1000:.3f}"
+    response.headers["X-Execution-Ms"] = f"{timing.execution * 1000:.3f}"
+    metrics.LANE_QUEUE_SECONDS.observe(lane_name, value=timing.queue_wait)
+
+
+async def _run_in_lane(lane_name: str, response: Response, fn, *args, stage: Optional[str] = None):
     """
-    Перетворює вхідні дані з запиту у формат, придатний для моделі.
+    Виконує важку роботу у пулі відповідної смуги, не блокуючи event loop.
+    Переповнена черга одразу дає 503; час очікування та виконання — у заголовках.
+    stage — етап для /metrics, якщо fn виконується в іншому процесі і не може
+    записати його сама.
     """
-    processed_data = data.copy()
+    try:
+        result, timing = await inference_lanes[lane_name].run(fn, *args)
+    except InferenceQueueFull:
+        raise _overloaded(lane_name)
+    except InferenceWorkersLost as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    _record_timing(lane_name, response, timing)
+    if stage is not None:
+        metrics.STAGE_SECONDS.observe(stage, value=timing.execution)
+    return result
 
-    # Інжиніринг ознак, ідентичний до preprocessor.py
-    weather_mapping = {'Calm': 0, 'Moderate': 1, 'Stormy': 2}
-    processed_data['weather_conditions'] = processed_data['weather_conditions'].map(weather_mapping)
 
-    processed_data['month_sin'] = np.sin(2 * np.pi * processed_data['month'] / 12)
-    processed_data['month_cos'] = np.cos(2 * np.pi * processed_data['month'] / 12)
-    processed_data.drop('month', axis=1, inplace=True)
-    
-    # One-Hot Encoding
-    categorical_cols = ['ship_type', 'route_id', 'fuel_type']
-    processed_data = pd.get_dummies(processed_data, columns=categorical_cols)
+async def _predict_one(bundle: ArtifactBundle, request: PredictionRequest, response: Response) -> float:
+    """Прогноз для одного запиту — через мікробатчер, якщо він увімкнений."""
+    if predict_batcher is None:
+        return (await _run_in_lane("predict", response, predict_values, bundle, [request]))[0]
+
+    try:
+        value, timing, batch_size = await predict_batcher.submit(bundle, request)
+    except InferenceQueueFull:
+        raise _overloaded("predict")
+    _record_timing("predict", response, timing)
+    response.headers["X-Batch-Size"] = str(batch_size)
+    return value
 
-    # Узгодження колонок з тим порядком, на якому навчалася модель
-    processed_data = processed_data.reindex(columns=feature_order, fill_value=0)
 
-    return processed_data
+async def _explain_matrix(bundle: ArtifactBundle, features: np.ndarray, response: Response) -> np.ndarray:
+    """SHAP-матриця у смузі /explain; у процесному пулі кожен воркер має власний explainer."""
+    if config.EXPLAIN_PROCESS_POOL:
+        return await _run_in_lane("explain", response, explain_in_worker, features, stage="shap")
+    return await _run_in_lane("explain", response, shap_matrix, bundle, features)
 
 
 @app.get("/", tags=["General"])
 def read_root():
-    return {"message": "Welcome to the OptiFuel API!"}
+    bundle = active_artifacts
+    return {
+        "message": "Welcome to the OptiFuel API!",
+        "model_version": bundle.version if bundle is not None else None,
+    }
+
+
+@app.get("/health/ready", tags=["General"])
+def readiness(response: Response):
+    """
+    Готовність приймати трафік: модель завантажена і прогріта. Стан SHAP
+    повідомляється окремо — /explain працює і до завершення його прогріву.
+    """
+    bundle = active_artifacts
+    if bundle is None:
+        response.status_code = 503
+        return {"status": "loading", "model_version": None, "explainer_ready": False}
+    return {
+        "status": "ready",
+        "model_version": bundle.version,
+        "explainer_ready": explainer_warm_version == bundle.version,
+    }
+
+
+@app.get("/cache/stats", tags=["General"])
+def cache_stats():
+    """Лічильники кешу відповідей: влучання, промахи, витіснення."""
+    return response_cache.stats()
+
+
+@app.get("/metrics", tags=["General"], response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Метрики у текстовому форматі Prometheus: запити, затримки етапів, черги, версія моделі."""
+    bundle = active_artifacts
+    metrics.MODEL_INFO.clear()
+    if bundle is not None:
+        metrics.MODEL_INFO.set(bundle.version, value=1)
+    for name, lane in list(inference_lanes.items()):
+        metrics.LANE_PENDING.set(name, value=lane.pending)
+    stats = response_cache.stats()
+    for event in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        metrics.CACHE_EVENTS.set(event, value=stats[event])
+    metrics.CACHE_ENTRIES.set(value=stats["size"])
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def _check_admin_token(x_admin_token: Optional[str]) -> None:
+    # Без налаштованого токена адмін-ендпоінти не існують, а не відкриті всім
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled (set OPTIFUEL_ADMIN_TOKEN)")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), config.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.post("/admin/reload", tags=["Admin"])
+async def reload_model(x_admin_token: Optional[str] = Header(None)):
+    """Перезавантажує артефакти з диска без перезапуску сервісу."""
+    _check_admin_token(x_admin_token)
+
+    try:
+        reloaded = await reload_artifacts(force=True)
+    except ArtifactsUpdating as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"Artifact loading error: {e}")
+
+    return {"reloaded": reloaded, "model_version": active_artifacts.version}
+
+
+def _require_profiler(x_admin_token: Optional[str]) -> None:
+    _check_admin_token(x_admin_token)
+    if not config.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled (set OPTIFUEL_PROFILER_ENABLED=1)")
+
+
+@app.post("/admin/profile", status_code=202, tags=["Admin"])
+def start_profile(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(5.0, ge=1),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """Вмикає семплювальний профайлер на seconds секунд; результат — GET /admin/profile."""
+    _require_profiler(x_admin_token)
+    if seconds > config.PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=422, detail=f"seconds must not exceed {config.PROFILER_MAX_SECONDS}")
+    try:
+        profiler.start(seconds, interval_ms / 1000)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    logging.info(f"Sampling profiler started for {seconds}s at {interval_ms} ms interval.")
+    return {"running": True, "seconds": seconds, "interval_ms": interval_ms}
+
+
+@app.get("/admin/profile", tags=["Admin"])
+def read_profile(
+    format: str = Query("summary", pattern="^(summary|collapsed)$"),
+    top: int = Query(30, ge=1),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """
+    Результат останньої сесії профілювання: summary — функції з найбільшою
+    кількістю семплів, collapsed — стеки для flamegraph.pl або speedscope.
+    """
+    _require_profiler(x_admin_token)
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed())
+    return profiler.summary(top)
+
+
+# Бінарний формат батч-ендпоінтів — для опису в OpenAPI
+_BINARY_BATCH_RESPONSE = {200: {"content": {BINARY_MEDIA_TYPE: {}}}}
 
 
 @app.post("/predict", response_model=PredictionResponse, tags=["Prediction"])
-def predict(request: PredictionRequest):
-    if not all(k in ml_artifacts for k in ["model", "scaler", "feature_order"]):
-        raise HTTPException(
-            status_code=503,
-            detail="Service Unavailable: ML artifacts not loaded. Check application logs."
-        )
+async def predict(request: PredictionRequest, response: Response):
+    bundle = _require_artifacts(response)
+
+    # Відповіді збираються як dict і серіалізуються orjson напряму, без
+    # pydantic-моделі відповіді; response_model лишається для схеми OpenAPI
+    cache_key = response_cache.make_key("predict", request, bundle.version)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return json_response({"predicted_fuel_consumption": cached}, response)
 
     try:
-        input_df = pd.DataFrame([request.dict()])
-        processed_df = preprocess_input(input_df, ml_artifacts["feature_order"])
-        
-        # Масштабування
-        scaled_features = ml_artifacts["scaler"].transform(processed_df)
-        
-        # Прогноз
-        prediction = ml_artifacts["model"].predict(scaled_features)
+        prediction = await _predict_one(bundle, request, response)
 
-        return PredictionResponse(predicted_fuel_consumption=round(prediction[0], 2))
+        result = round(float(prediction), 2)
+        response_cache.put(cache_key, result)
+        return json_response({"predicted_fuel_consumption": result}, response)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error during prediction: {e}", exc_info=True)
         raise HTTPException(status_code=400, detail=f"Failed to process request: {str(e)}")
-    
 
-@app.post("/explain")
-def explain(request: PredictionRequest):
-    if not explainer or not ml_artifacts["scaler"]:
-        raise HTTPException(status_code=503, detail="Explainer or Scaler not loaded")
+
+@app.post("/predict/batch", response_model=List[PredictionResponse], responses=_BINARY_BATCH_RESPONSE, tags=["Prediction"])
+async def predict_batch(
+    response: Response,
+    requests: List[PredictionRequest] = Body(..., max_length=config.PREDICT_BATCH_MAX_ITEMS),
+    accept: Optional[str] = Header(None),
+):
+    """
+    Прогноз для списку рейсів за один векторизований прохід scaler + model.
+    З Accept: application/x-optifuel-f64 — матриця n x 1 у бінарному форматі.
+    Батч, довший за OPTIFUEL_PREDICT_BATCH_MAX_ITEMS, відхиляється з 422.
+    """
+    bundle = _require_artifacts(response)
+    binary = accepts_binary(accept)
+
+    if not requests:
+        return binary_response(np.empty((0, 1)), response) if binary else json_response([], response)
 
     try:
-        input_df = pd.DataFrame([request.dict()])
-        processed_df = preprocess_input(input_df, ml_artifacts["feature_order"]) 
-        scaled_features = ml_artifacts["scaler"].transform(processed_df)
+        predictions = await _run_in_lane("predict", response, predict_values, bundle, requests)
+        rounded = [round(float(p), 2) for p in predictions]
 
-        shap_values = explainer.shap_values(scaled_features)
+        if binary:
+            return binary_response(np.array(rounded).reshape(-1, 1), response)
+        return json_response([{"predicted_fuel_consumption": p} for p in rounded], response)
 
-        values = shap_values[0] if isinstance(shap_values, list) else shap_values
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error during batch prediction: {e}", exc_info=True)
+        raise HTTPException(status_code=400, detail=f"Failed to process batch request: {str(e)}")
 
-        if len(values.shape) > 1:
-            values = values[0]
 
-        explanation = {}
-        for i, col_name in enumerate(ml_artifacts["feature_order"]):
-            explanation[col_name] = float(values[i])
 
-        return explanation
+def _explanation(bundle: ArtifactBundle, values: np.ndarray, top_k: Optional[int] = None) -> dict:
+    """
+    Будує словник {ознака: внесок} у порядку ознак моделі. З top_k — не більше
+    k ознак з найбільшим |внеском|, відсортованих за спаданням |внеску|
+    (і тоді, коли k не менше за кількість ознак).
+    """
+    feature_order = bundle.feature_order
+    if top_k is None:
+        return dict(zip(feature_order, values.tolist()))
+    magnitude = np.abs(values)
+    if top_k < len(values):
+        top = np.argpartition(-magnitude, top_k - 1)[:top_k]
+        top = top[np.argsort(-magnitude[top], kind="stable")]
+    else:
+        top = np.argsort(-magnitude, kind="stable")
+    return {feature_order[i]: float(values[i]) for i in top}
+
+
+def _require_explainer(response: Response) -> ArtifactBundle:
+    bundle = active_artifacts
+    if bundle is None or bundle.explainer is None or bundle.explainer.failed:
+        raise HTTPException(status_code=503, detail="Explainer or Scaler not loaded")
+    metrics.observe_validation()
+    response.headers["X-Model-Version"] = bundle.version
+    return bundle
+
 
+@app.post("/explain")
+async def explain(request: PredictionRequest, response: Response, top_k: Optional[int] = Query(None, ge=1)):
+    bundle = _require_explainer(response)
+
+    # SHAP — найдорожчий виклик сервісу, тож повторні запити беремо з кешу
+    cache_key = response_cache.make_key("explain", request, bundle.version)
+    values = response_cache.get(cache_key)
+    if values is not None:
+        return json_response(_explanation(bundle, values, top_k), response)
+
+    try:
+        with metrics.STAGE_SECONDS.time("preprocess_input"):
+            features = bundle.encoder.transform_one(request)
+        values = (await _explain_matrix(bundle, features, response))[0]
+
+        response_cache.put(cache_key, values)
+        return json_response(_explanation(bundle, values, top_k), response)
+
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Explanation error: {e}")
-        
-        raise HTTPException(status_code=400, detail=f"Explanation failed: {str(e)}")
\ No newline at end of file
+
+        raise HTTPException(status_code=400, detail=f"Explanation failed: {str(e)}")
+
+
+@app.post("/explain/batch", responses=_BINARY_BATCH_RESPONSE)
+async def explain_batch(
+    response: Response,
+    requests: List[PredictionRequest] = Body(..., max_length=config.EXPLAIN_BATCH_MAX_ITEMS),
+    top_k: Optional[int] = Query(None, ge=1),
+    accept: Optional[str] = Header(None),
+):
+    """
+    Пояснення для списку рейсів: SHAP рахується одним викликом на всю матрицю
+    запитів, яких ще немає в кеші. З Accept: application/x-optifuel-f64 —
+    повна матриця n x ознаки (top_k не застосовується), назви колонок у
+    заголовку X-Feature-Order. Батч, довший за OPTIFUEL_EXPLAIN_BATCH_MAX_ITEMS,
+    відхиляється з 422.
+    """
+    bundle = _require_explainer(response)
+
+    keys = [response_cache.make_key("explain", r, bundle.version) for r in requests]
+    rows = [response_cache.get(k) for k in keys]
+    missing = [i for i, row in enumerate(rows) if row is None]
+
+    try:
+        if missing:
+            with metrics.STAGE_SECONDS.time("preprocess_input"):
+                features = bundle.encoder.transform([requests[i] for i in missing])
+            matrix = await _explain_matrix(bundle, features, response)
+            for i, values in zip(missing, matrix):
+                # Копія рядка, щоб кеш не тримав усю матрицю батчу
+                rows[i] = values.copy()
+                response_cache.put(keys[i], rows[i])
+
+        if accepts_binary(accept):
+            matrix = np.vstack(rows) if rows else np.empty((0, len(bundle.feature_order)))
+            return binary_response(matrix, response, bundle.feature_order)
+        return json_response([_explanation(bundle, values, top_k) for values in rows], response)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Batch explanation error: {e}")
+
+        raise HTTPException(status_code=400, detail=f"Batch explanation failed: {str(e)}")
@@ -0,0 +1,212 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Метрики сервісу у текстовому форматі Prometheus. Реалізація власна і
+# мінімальна (лічильник, gauge, гістограма), щоб не тягнути prometheus_client
+# у контейнер; усі метрики потокобезпечні, бо етапи інференсу виконуються
+# у пулах потоків.
+
+# Межі кошиків для затримок етапів: від 50 мкс (кодування одного запиту)
+# до секунд (SHAP для великого батчу)
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def set(self, *labels: str, value: float) -> None:
+        """Значення, яке веде інший об'єкт (напр. лічильники кешу), — копіюється перед експортом."""
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}" for labels, v in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [лічильники по кошиках (не кумулятивні) + переповнення, сума]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(*labels, value=time.perf_counter() - started)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        lines = self.header()
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "optifuel_http_requests_total", "HTTP requests by route, method and status code.", ("endpoint", "method", "status")))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "optifuel_http_request_duration_seconds", "End-to-end HTTP request latency.", ("endpoint", "method")))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "optifuel_http_requests_in_flight", "HTTP requests currently being processed."))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "optifuel_stage_duration_seconds",
+    "Latency of each request stage: validation, preprocess_input, scaling, predict, prediction_table, shap.",
+    ("stage",)))
+LANE_QUEUE_SECONDS = REGISTRY.register(Histogram(
+    "optifuel_inference_queue_wait_seconds", "Time spent waiting for an inference lane worker.", ("lane",)))
+LANE_PENDING = REGISTRY.register(Gauge(
+    "optifuel_inference_lane_pending", "Requests queued or running in each inference lane.", ("lane",)))
+MODEL_INFO = REGISTRY.register(Gauge(
+    "optifuel_model_info", "Active model artifacts version (value is always 1).", ("version",)))
+CACHE_EVENTS = REGISTRY.register(Counter(
+    "optifuel_response_cache_events_total", "Response cache hits, misses, evictions, expirations and invalidations.", ("event",)))
+CACHE_ENTRIES = REGISTRY.register(Gauge(
+    "optifuel_response_cache_entries", "Entries currently held in the response cache."))
+
+# Момент, коли запит увійшов у сервіс (ставить middleware); до входу в обробник
+# встигають прочитати тіло, розібрати JSON і провалідувати його pydantic-ом
+_request_started: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_started", default=None)
+
+
+def observe_validation() -> None:
+    """Фіксує етап validation: від входу запиту до початку роботи обробника."""
+    started = _request_started.get()
+    if started is not None:
+        STAGE_SECONDS.observe("validation", value=time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: лічильник запитів за маршрутом і статусом, гістограма
+    повної затримки та кількість запитів в обробці. Мітка endpoint — шаблон
+    маршруту, а не сирий шлях, тож кількість часових рядів обмежена.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        token = _request_started.set(started)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec()
+            _request_started.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUESTS.inc(route, scope["method"], str(status["code"]))
+            REQUEST_SECONDS.observe(route, scope["method"], value=time.perf_counter() - started)
@@ -1,11 +1,8 @@
 from pydantic import BaseModel, Field
-from typing import Literal
 
-# Using Literal for strict validation of string inputs to prevent typos
-ShipType = Literal["Oil Service Boat", "Fishing Trawler", "Surfer Boat", "Tanker Ship"]
-RouteID = Literal["Warri-Bonny", "Port Harcourt-Lagos", "Lagos-Apapa", "Escravos-Lagos"]
-FuelType = Literal["HFO", "Diesel"]
-WeatherConditions = Literal["Calm", "Moderate", "Stormy"]
+# Using Literal for strict validation of string inputs to prevent typos;
+# the same types define the feature encoder's categories
+from optifuel_common.schema import FuelType, RouteID, ShipType, WeatherConditions
 
 class PredictionRequest(BaseModel):
     """
@@ -0,0 +1,164 @@
+import itertools
+import logging
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple, get_args
+
+import numpy as np
+
+from optifuel_common.encoder import FeatureEncoder
+
+from .compact_model import CompactModel
+from .models import FuelType, PredictionRequest, RouteID, ShipType, WeatherConditions
+
+# Неперервні ознаки; решта запиту — скінченний перелік категорій
+DISTANCE, EFFICIENCY = 'distance', 'engine_efficiency'
+MONTHS = tuple(range(1, 13))
+
+
+def _combo_key(request: PredictionRequest) -> Tuple:
+    return (request.ship_type, request.route_id, request.fuel_type, request.weather_conditions, request.month)
+
+
+class PredictionTable:
+    """
+    Точна таблиця прогнозів для всіх категоріальних комбінацій запиту.
+
+    Для фіксованої комбінації (тип судна, маршрут, паливо, погода, місяць)
+    деревний ансамбль є кусково-сталою функцією від (distance, engine_efficiency):
+    межі кусків — це пороги розбиття за цими двома ознаками, досяжні за даної
+    комбінації. Тому прогноз у кожній клітинці сітки порогів рахується один раз
+    на старті, а запит зводиться до двох бінарних пошуків і звернення до масиву.
+    """
+
+    def __init__(self, cells: Dict[Tuple, Tuple[List[float], List[float], np.ndarray]]):
+        self._cells = cells
+        self.n_cells = sum(values.size for _, _, values in cells.values())
+
+    @classmethod
+    def build(cls, model: CompactModel, encoder: FeatureEncoder, max_cells: int) -> Optional["PredictionTable"]:
+        """Будує таблицю або повертає None, якщо модель не підходить чи сітка завелика."""
+        if not isinstance(model, CompactModel) or model.kind != "tree_ensemble":
+            logging.warning("Prediction table requires a compact tree ensemble artifact; table disabled.")
+            return None
+        feature_order = encoder.feature_order
+        if DISTANCE not in feature_order or EFFICIENCY not in feature_order:
+            logging.warning("Prediction table: continuous features are missing from feature_order; table disabled.")
+            return None
+        continuous = (feature_order.index(DISTANCE), feature_order.index(EFFICIENCY))
+
+        keys = list(itertools.product(get_args(ShipType), get_args(RouteID), get_args(FuelType),
+                                      get_args(WeatherConditions), MONTHS))
+        base = encoder.transform([
+            PredictionRequest(distance=1.0, engine_efficiency=0.0, ship_type=s, route_id=r,
+                              fuel_type=f, weather_conditions=w, month=m)
+            for s, r, f, w, m in keys
+        ])
+
+        cuts = cls._reachable_cuts(model, base, continuous)
+        total = sum((len(d) + 1) * (len(e) + 1) for d, e in cuts)
+        if total > max_cells:
+            logging.warning(f"Prediction table needs {total} cells (limit {max_cells}); table disabled.")
+            return None
+
+        # Кожне дерево рахується на власній (малій) сітці своїх порогів для всіх
+        # комбінацій одразу, а тоді розкладається на сітку кожної комбінації.
+        points = [(cls._cell_points(d), cls._cell_points(e)) for d, e in cuts]
+        sums = [np.zeros((len(d), len(e))) for d, e in points]
+        arrays = model.arrays
+        bounds = list(model.roots) + [len(arrays)]
+        for tree, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            block = arrays[start:end]
+            inner = np.isfinite(block["threshold"])
+            d_tree = np.unique(block["threshold"][inner & (block["feature"] == continuous[0])])
+            e_tree = np.unique(block["threshold"][inner & (block["feature"] == continuous[1])])
+            d_tree_points, e_tree_points = cls._cell_points(d_tree), cls._cell_points(e_tree)
+
+            n_points = len(d_tree_points) * len(e_tree_points)
+            grid = np.repeat(base, n_points, axis=0)
+            grid[:, continuous[0]] = np.tile(np.repeat(d_tree_points, len(e_tree_points)), len(keys))
+            grid[:, continuous[1]] = np.tile(e_tree_points, len(d_tree_points) * len(keys))
+            tree_values = model.leaf_values(grid, roots=model.roots[tree:tree + 1])
+            tree_values = tree_values.reshape(len(keys), len(d_tree_points), len(e_tree_points))
+
+            for c, (d_points, e_points) in enumerate(points):
+                d_cell = np.searchsorted(d_tree, d_points, side='left')
+                e_cell = np.searchsorted(e_tree, e_points, side='left')
+                sums[c] += tree_values[c][np.ix_(d_cell, e_cell)]
+
+        cells = {
+            key: (d_cuts.tolist(), e_cuts.tolist(), model.base_value + model.tree_scale * leaf_sum)
+            for key, (d_cuts, e_cuts), leaf_sum in zip(keys, cuts, sums)
+        }
+
+        table = cls(cells)
+        logging.info(f"Prediction table built: {len(cells)} combinations, {table.n_cells} cells.")
+        return table
+
+    @staticmethod
+    def _reachable_cuts(model: CompactModel, base: np.ndarray, continuous: Tuple[int, int]):
+        """
+        Для кожної комбінації повертає пороги за (distance, efficiency), що лежать
+        на досяжних шляхах дерев. Досяжність поширюється від кореня вниз для всіх
+        комбінацій одночасно (батьківські вузли завжди передують дочірнім).
+        """
+        arrays = model.arrays
+        feature, threshold = arrays["feature"], arrays["threshold"]
+        n_combos = base.shape[0]
+
+        inner = np.isfinite(threshold)
+        uniques = [np.unique(threshold[inner & (feature == f)]) for f in continuous]
+        used = [np.zeros((len(u), n_combos), dtype=bool) for u in uniques]
+
+        bounds = list(model.roots) + [len(arrays)]
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            reach = np.zeros((end - start, n_combos), dtype=bool)
+            reach[0] = True
+            for node in range(start, end):
+                if not inner[node]:
+                    continue
+                r = reach[node - start]
+                if not r.any():
+                    continue
+                f, t = feature[node], threshold[node]
+                left, right = arrays["left"][node] - start, arrays["right"][node] - start
+                if f in continuous:
+                    k = continuous.index(f)
+                    used[k][np.searchsorted(uniques[k], t)] |= r
+                    reach[left] |= r
+                    reach[right] |= r
+                else:
+                    go_left = base[:, f] <= t
+                    reach[left] |= r & go_left
+                    reach[right] |= r & ~go_left
+
+        return [(uniques[0][used[0][:, c]], uniques[1][used[1][:, c]]) for c in range(n_combos)]
+
+    @staticmethod
+    def _cell_points(cuts: np.ndarray) -> np.ndarray:
+        """Представник кожної клітинки (t[k-1], t[k]]; остання клітинка — праворуч від усіх порогів."""
+        if len(cuts) == 0:
+            return np.zeros(1)
+        return np.append(cuts, np.nextafter(cuts[-1], np.inf))
+
+    def lookup(self, request: PredictionRequest) -> float:
+        d_cuts, e_cuts, values = self._cells[_combo_key(request)]
+        return float(values[bisect_left(d_cuts, request.distance), bisect_left(e_cuts, request.engine_efficiency)])
+
+    def lookup_many(self, requests: Sequence[PredictionRequest]) -> np.ndarray:
+        return np.fromiter((self.lookup(r) for r in requests), dtype=np.float64, count=len(requests))
+
+    def verify(self, model, encoder: FeatureEncoder, n_samples: int, seed: int = 42) -> float:
+        """Звіряє таблицю з живою моделлю на випадкових запитах; повертає макс. абсолютну похибку."""
+        rng = np.random.default_rng(seed)
+        keys = list(self._cells)
+        max_distance = max((d[-1] for d, _, _ in self._cells.values() if d), default=1000.0)
+        requests = []
+        for i in rng.integers(len(keys), size=n_samples):
+            s, r, f, w, m = keys[i]
+            requests.append(PredictionRequest(
+                distance=float(rng.uniform(1e-3, max_distance * 1.1)),
+                engine_efficiency=float(rng.uniform(0, 100)),
+                ship_type=s, route_id=r, fuel_type=f, weather_conditions=w, month=m,
+            ))
+        expected = model.predict(encoder.transform(requests))
+        return float(np.max(np.abs(self.lookup_many(requests) - expected))) if requests else 0.0
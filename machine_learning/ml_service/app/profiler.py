@@ -0,0 +1,110 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+
+class ProfilerBusy(RuntimeError):
+    """Профілювання вже запущене — одночасно може працювати лише одна сесія."""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Семплювальний профайлер, який вмикається на льоту на задану кількість секунд.
+
+    Фоновий потік кожні interval секунд знімає стеки всіх потоків процесу
+    (sys._current_frames) і рахує, як часто трапляється кожен стек. Накладні
+    витрати пропорційні частоті семплів, а не кількості викликів, тож його
+    можна вмикати під робочим навантаженням. Потоки, що простоюють в очікуванні
+    (event loop у select, вільні воркери пулу), відкидаються, щоб результат
+    показував, де саме витрачається CPU: pandas, sklearn чи shap. Процесний
+    пул /explain працює в інших процесах і сюди не потрапляє.
+    """
+
+    # Верхні кадри стеку, що означають простій потоку, а не роботу
+    IDLE_FUNCTIONS = frozenset({"wait", "select", "poll", "_worker", "sleep", "accept"})
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._interval = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, interval: float = 0.005) -> None:
+        with self._lock:
+            if self.running:
+                raise ProfilerBusy("A profiling session is already running")
+            self._stacks = Counter()
+            self._samples = 0
+            self._interval = interval
+            self._started = time.time()
+            self._finished = None
+            self._thread = threading.Thread(target=self._run, args=(seconds, interval),
+                                            name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def _run(self, seconds: float, interval: float) -> None:
+        own_id = threading.get_ident()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or frame.f_code.co_name in self.IDLE_FUNCTIONS:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stacks.append(tuple(reversed(stack)))
+            with self._lock:
+                self._stacks.update(stacks)
+                self._samples += 1
+            time.sleep(interval)
+        self._finished = time.time()
+
+    def collapsed(self) -> str:
+        """Стеки у форматі collapsed ('кадр;кадр;кадр кількість') для flamegraph.pl або speedscope."""
+        with self._lock:
+            items = self._stacks.most_common()
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in items)
+
+    def summary(self, top: int = 30) -> Dict:
+        """Стан сесії і функції з найбільшою кількістю семплів: власних (вершина стеку) і сумарних."""
+        with self._lock:
+            stacks = list(self._stacks.items())
+            samples = self._samples
+
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in stacks:
+            own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+
+        def rows(counter: Counter) -> List[Dict]:
+            return [{"frame": label, "samples": n} for label, n in counter.most_common(top)]
+
+        return {
+            "running": self.running,
+            "started_at": self._started,
+            "finished_at": self._finished,
+            "interval_seconds": self._interval,
+            "samples": samples,
+            "busy_stacks": sum(count for _, count in stacks),
+            "top_self": rows(own),
+            "top_cumulative": rows(total),
+        }
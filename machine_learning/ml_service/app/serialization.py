@@ -0,0 +1,97 @@
+import json
+import struct
+from typing import Any, Optional, Sequence
+
+import numpy as np
+from fastapi.responses import JSONResponse, Response
+
+# orjson серіалізує у кілька разів швидше за стандартний json і напряму
+# розуміє numpy; якщо його немає в образі — стандартний json з тим самим виходом
+try:
+    import orjson
+except ImportError:  # pragma: no cover - залежить від образу
+    orjson = None
+
+# Компактний бінарний формат для батчів: заголовок з двох uint32 (рядки,
+# колонки), далі рядки*колонки float64 у порядку рядків; усе little-endian.
+# Для /explain/batch назви колонок — у заголовку X-Feature-Order (JSON-масив).
+BINARY_MEDIA_TYPE = "application/x-optifuel-f64"
+_HEADER = struct.Struct("<II")
+
+# Заголовки, які формує сама відповідь, а не обробник
+_OWN_HEADERS = frozenset({"content-length", "content-type"})
+
+
+def _default(value: Any):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON-відповідь через orjson (або json, якщо orjson не встановлено).
+
+    Обробники повертають її напряму з готовими dict/list, тож FastAPI не
+    проганяє результат через jsonable_encoder і pydantic-моделі відповіді.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def handler_headers(response: Response) -> dict:
+    """Заголовки, виставлені обробником на Response-параметрі (версія моделі, таймінги)."""
+    return {k: v for k, v in response.headers.items() if k.lower() not in _OWN_HEADERS}
+
+
+def json_response(content: Any, response: Response) -> FastJSONResponse:
+    return FastJSONResponse(content, headers=handler_headers(response))
+
+
+def accepts_binary(accept: Optional[str]) -> bool:
+    """Чи просить клієнт бінарний формат у заголовку Accept (q=0 означає відмову)."""
+    if not accept:
+        return False
+    for part in accept.split(","):
+        media_type, _, params = part.partition(";")
+        if media_type.strip().lower() != BINARY_MEDIA_TYPE:
+            continue
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def encode_matrix(matrix: np.ndarray) -> bytes:
+    matrix = np.atleast_2d(np.asarray(matrix, dtype="<f8"))
+    if matrix.ndim != 2:
+        raise ValueError(f"Expected a 2-D matrix, got shape {matrix.shape}")
+    rows, cols = matrix.shape
+    return _HEADER.pack(rows, cols) + np.ascontiguousarray(matrix).tobytes()
+
+
+def decode_matrix(payload: bytes) -> np.ndarray:
+    """Зворотне до encode_matrix — для Python-клієнтів і бенчмарків."""
+    rows, cols = _HEADER.unpack_from(payload)
+    return np.frombuffer(payload, dtype="<f8", count=rows * cols, offset=_HEADER.size).reshape(rows, cols)
+
+
+def binary_response(matrix: np.ndarray, response: Response, columns: Optional[Sequence[str]] = None) -> Response:
+    headers = handler_headers(response)
+    if columns is not None:
+        headers["X-Feature-Order"] = dumps(list(columns)).decode("utf-8")
+    return Response(encode_matrix(matrix), media_type=BINARY_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,119 @@
+"""
+Запуск ml_service у кількох процесах-воркерах зі спільною копією моделі.
+
+    python -m app.server --host 0.0.0.0 --port 8000 --workers 4
+
+Кількість воркерів — --workers або OPTIFUEL_WORKERS (за замовчуванням 1:
+звичайний однопроцесний uvicorn без fork).
+
+З кількома воркерами master-процес спершу імпортує застосунок, завантажує
+артефакти і будує SHAP explainer (app.main.preload_artifacts), відкриває
+сокет і лише потім форкає воркерів. Масиви дерев, розпакована sklearn-модель,
+explainer та імпортовані бібліотеки лишаються у спільних сторінках пам'яті
+(copy-on-write), які воркери лише читають; gc.freeze() перед fork не дає
+збирачу сміття торкатися цих об'єктів і тим самим копіювати сторінки.
+Компактний артефакт до того ж відкривається через mmap, тож і нова версія
+після гарячого перезавантаження лежить у пам'яті один раз (page cache).
+
+Master сам запитів не обслуговує: він перезапускає воркера, що впав, і
+пересилає SIGTERM/SIGINT воркерам для коректної зупинки. Метрики (/metrics)
+і кеш відповідей — окремі в кожному воркері.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import time
+
+import uvicorn
+from threadpoolctl import threadpool_limits
+
+from . import config
+from .main import app, preload_artifacts
+
+
+def _serve(uvicorn_config: uvicorn.Config, sock, threads: int) -> None:
+    # Обробники сигналів master-а воркеру не потрібні — uvicorn ставить власні
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    # OpenMP/BLAS у кожному воркері ділять ядра між процесами, як у пошуку гіперпараметрів
+    threadpool_limits(limits=threads)
+    uvicorn.Server(uvicorn_config).run(sockets=[sock])
+
+
+def _fork_worker(uvicorn_config: uvicorn.Config, sock, threads: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _serve(uvicorn_config, sock, threads)
+        except BaseException:
+            logging.exception("Worker crashed.")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def run(host: str, port: int, workers: int, log_level: str = "info") -> None:
+    uvicorn_config = uvicorn.Config(app, host=host, port=port, log_level=log_level, lifespan="on")
+    if workers <= 1:
+        uvicorn.Server(uvicorn_config).run()
+        return
+
+    sock = uvicorn_config.bind_socket()
+    started = time.perf_counter()
+    bundle = preload_artifacts()
+    if bundle is not None:
+        logging.info(f"Preloaded model version {bundle.version} in {time.perf_counter() - started:.2f}s.")
+    gc.collect()
+    gc.freeze()
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    children = {_fork_worker(uvicorn_config, sock, threads) for _ in range(workers)}
+    logging.info(f"Started {workers} workers ({threads} compute threads each): {sorted(children)}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            logging.warning(f"Worker {pid} exited with code {os.waitstatus_to_exitcode(status)}; restarting.")
+            # Пауза, щоб воркер, що падає одразу на старті, не крутив fork у циклі
+            time.sleep(1)
+            children.add(_fork_worker(uvicorn_config, sock, threads))
+
+    sock.close()
+    logging.info("All workers stopped.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run ml_service with workers forked from a preloaded master.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=config.WORKERS,
+                        help="Worker processes (default: OPTIFUEL_WORKERS or 1)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    run(args.host, args.port, args.workers, args.log_level)
+
+
+if __name__ == "__main__":
+    main()
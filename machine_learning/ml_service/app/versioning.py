@@ -0,0 +1,78 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+from optifuel_common.atomic import atomic_write
+
+# Маніфест версії артефактів. Пайплайни тренування записують його останнім
+# (атомарно, через os.replace), тож поява нової версії означає, що всі файли
+# вже на місці, а хеші дозволяють виявити набір, який ще перезаписується.
+VERSION_FILE = "artifacts_version.json"
+TRACKED_FILES = (
+    "best_model.joblib",
+    "scaler.joblib",
+    "feature_order.joblib",
+    "feature_encoder.json",
+    "compact_model.json",
+    "compact_model.npy",
+)
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_digests(artifacts_dir: Path) -> Dict[str, str]:
+    """SHA-256 кожного наявного файлу артефактів."""
+    artifacts_dir = Path(artifacts_dir)
+    return {
+        name: _file_digest(artifacts_dir / name)
+        for name in TRACKED_FILES
+        if (artifacts_dir / name).exists()
+    }
+
+
+def _combined_digest(digests: Dict[str, str]) -> str:
+    return hashlib.sha256(json.dumps(digests, sort_keys=True).encode()).hexdigest()[:8]
+
+
+def write_version_manifest(artifacts_dir: Path) -> str:
+    """Фіксує поточний набір артефактів як нову версію; повертає її ідентифікатор."""
+    artifacts_dir = Path(artifacts_dir)
+    digests = artifact_digests(artifacts_dir)
+    created_at = datetime.now(timezone.utc)
+    version = f"{created_at:%Y%m%dT%H%M%SZ}-{_combined_digest(digests)}"
+
+    manifest = {"version": version, "created_at": created_at.isoformat(), "files": digests}
+    with atomic_write(artifacts_dir / VERSION_FILE) as f:
+        json.dump(manifest, f, indent=2)
+    return version
+
+
+def read_version_manifest(artifacts_dir: Path) -> Optional[dict]:
+    path = Path(artifacts_dir) / VERSION_FILE
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def resolve_version(artifacts_dir: Path) -> Optional[str]:
+    """
+    Версія набору артефактів на диску. Без маніфесту версія виводиться з
+    хешів файлів; None означає, що файли не збігаються з маніфестом
+    (набір саме перезаписується).
+    """
+    manifest = read_version_manifest(artifacts_dir)
+    digests = artifact_digests(artifacts_dir)
+    if manifest is None:
+        return f"unversioned-{_combined_digest(digests)}"
+    if manifest.get("files") != digests:
+        return None
+    return manifest["version"]
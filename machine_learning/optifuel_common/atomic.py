@@ -0,0 +1,26 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def atomic_write(path: Path, mode: str = "w"):
+    """
+    Відкриває на запис тимчасовий файл поруч із path і після успішного
+    виходу з блоку підміняє ним path через os.replace; при помилці
+    тимчасовий файл видаляється, а path лишається незмінним.
+
+    Читач бачить або старий, або новий файл повністю, а не наполовину
+    записаний. Підміна створює новий inode, тож процес, що тримає старий
+    файл через mmap (компактна модель, оброблені вибірки), і далі читає
+    старі дані замість SIGBUS чи суміші старого й нового.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        with open(tmp_path, mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
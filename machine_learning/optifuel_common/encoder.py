@@ -0,0 +1,205 @@
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple, get_args
+
+import numpy as np
+
+from .atomic import atomic_write
+from .schema import FuelType, RouteID, ShipType, WeatherConditions
+
+# Єдиний опис ознак для preprocessor.py, retrain.py і сервісу.
+# Зміна схеми чи логіки кодування вимагає підняти ENCODER_VERSION.
+ENCODER_VERSION = 1
+ENCODER_FILE = "feature_encoder.json"
+
+# Погода кодується порядковим номером у WeatherConditions
+WEATHER_MAPPING = {value: code for code, value in enumerate(get_args(WeatherConditions))}
+PASSTHROUGH_COLUMNS = ('distance', 'engine_efficiency')
+CATEGORICAL_COLUMNS = ('ship_type', 'route_id', 'fuel_type')
+
+# Відомі категорії (ті самі Literal, що валідують запити) у відсортованому
+# порядку, як їх упорядковує get_dummies; з drop_first перша категорія
+# кожної колонки кодується нулями
+CATEGORY_SCHEMA = {
+    'ship_type': tuple(sorted(get_args(ShipType))),
+    'route_id': tuple(sorted(get_args(RouteID))),
+    'fuel_type': tuple(sorted(get_args(FuelType))),
+}
+MONTH_NUMBERS = {
+    'January': 1, 'February': 2, 'March': 3, 'April': 4, 'May': 5, 'June': 6,
+    'July': 7, 'August': 8, 'September': 9, 'October': 10, 'November': 11, 'December': 12
+}
+
+# Циклічне кодування місяця, пораховане один раз для 1..12
+MONTH_SIN = {m: float(np.sin(2 * np.pi * m / 12)) for m in range(1, 13)}
+MONTH_COS = {m: float(np.cos(2 * np.pi * m / 12)) for m in range(1, 13)}
+
+
+def schema_feature_order(drop_first: bool = True) -> List[str]:
+    """Порядок ознак, який дає схема: числові, one-hot, циклічний місяць."""
+    order = ['distance', 'weather_conditions', 'engine_efficiency']
+    for field, categories in CATEGORY_SCHEMA.items():
+        kept = categories[1:] if drop_first else categories
+        order.extend(f"{field}_{value}" for value in kept)
+    return order + ['month_sin', 'month_cos']
+
+
+class FeatureEncoder:
+    """
+    Скомпільований кодувальник сирих даних у матрицю ознак без участі pandas.
+
+    Будується один раз з feature_order: кожна ознака заздалегідь зведена до
+    індексу колонки, тож дані записуються напряму у попередньо виділений
+    NumPy-масив. Один і той самий об'єкт кодує запит до сервісу, список
+    запитів і частину сирого CSV під час тренування; зберігається разом
+    з моделлю у ENCODER_FILE.
+    """
+
+    def __init__(self, feature_order: Sequence[str], version: int = ENCODER_VERSION):
+        self.version = version
+        self.feature_order = list(feature_order)
+        self.n_features = len(self.feature_order)
+
+        index = {name: i for i, name in enumerate(self.feature_order)}
+        resolved = set()
+
+        # (індекс колонки, поле запиту) — значення копіюється як є
+        self._passthrough: List[Tuple[int, str]] = []
+        for col in PASSTHROUGH_COLUMNS:
+            if col in index:
+                self._passthrough.append((index[col], col))
+                resolved.add(col)
+
+        # (індекс колонки, поле запиту, таблиця значень)
+        self._mapped: List[Tuple[int, str, Dict]] = []
+        for col, field, mapping in (
+            ('weather_conditions', 'weather_conditions', WEATHER_MAPPING),
+            ('month_sin', 'month', MONTH_SIN),
+            ('month_cos', 'month', MONTH_COS),
+        ):
+            if col in index:
+                self._mapped.append((index[col], field, mapping))
+                resolved.add(col)
+
+        # (поле запиту, {категорія: індекс one-hot колонки})
+        self._one_hot: List[Tuple[str, Dict[str, int]]] = []
+        # Решта відомих категорій (відкинуті через drop_first) кодуються нулями
+        self._known_categories = {field: set(CATEGORY_SCHEMA[field]) for field in CATEGORICAL_COLUMNS}
+        for field in CATEGORICAL_COLUMNS:
+            prefix = f"{field}_"
+            slots = {
+                name[len(prefix):]: i
+                for name, i in index.items()
+                if name.startswith(prefix)
+            }
+            self._one_hot.append((field, slots))
+            self._known_categories[field].update(slots)
+            resolved.update(f"{prefix}{value}" for value in slots)
+
+        unresolved = [name for name in self.feature_order if name not in resolved]
+        if unresolved:
+            logging.warning(f"Feature encoder: columns {unresolved} are not produced from requests and stay zero.")
+
+    @classmethod
+    def from_schema(cls, drop_first: bool = True) -> "FeatureEncoder":
+        """Кодувальник для тренування: ознаки з CATEGORY_SCHEMA у порядку schema_feature_order."""
+        return cls(schema_feature_order(drop_first))
+
+    def save(self, output_dir: Path) -> Path:
+        """Серіалізує кодувальник у JSON поруч з іншими артефактами моделі."""
+        path = Path(output_dir) / ENCODER_FILE
+        with atomic_write(path) as f:
+            json.dump({"version": self.version, "feature_order": self.feature_order}, f, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, artifacts_dir: Path) -> "FeatureEncoder":
+        with open(Path(artifacts_dir) / ENCODER_FILE, encoding="utf-8") as f:
+            spec = json.load(f)
+        if spec["version"] != ENCODER_VERSION:
+            raise ValueError(
+                f"Feature encoder version {spec['version']} is not supported (expected {ENCODER_VERSION}); retrain the model"
+            )
+        return cls(spec["feature_order"], version=spec["version"])
+
+    @staticmethod
+    def exists(artifacts_dir: Path) -> bool:
+        return (Path(artifacts_dir) / ENCODER_FILE).exists()
+
+    def transform_frame(self, df) -> np.ndarray:
+        """
+        Кодує частину сирих даних (DataFrame з колонками сирого CSV) у матрицю
+        (n_rows, n_features). Місяць може бути назвою або номером. Невідомі
+        категорії — помилка: інакше вони мовчки закодувалися б нулями.
+        """
+        n = len(df)
+        X = np.zeros((n, self.n_features), dtype=np.float64)
+
+        for idx, field in self._passthrough:
+            X[:, idx] = df[field].to_numpy(dtype=np.float64)
+
+        columns = {field: df[field].to_numpy() for _, field, _ in self._mapped}
+        if 'month' in columns and columns['month'].dtype.kind in 'OUS':
+            columns['month'] = self._lookup(columns['month'], MONTH_NUMBERS, 'month')
+
+        # Ті самі таблиці значень, що й для запитів, — ознаки тренування і сервісу збігаються побітово
+        for idx, field, mapping in self._mapped:
+            X[:, idx] = self._lookup(columns[field], mapping, field)
+
+        for field, slots in self._one_hot:
+            values = df[field].to_numpy()
+            unknown = {str(v) for v in np.unique(values.astype(str))} - self._known_categories[field]
+            if unknown:
+                raise ValueError(f"Unknown values in column '{field}': {sorted(unknown)}")
+            for value, idx in slots.items():
+                X[:, idx] = values == value
+
+        return X
+
+    @staticmethod
+    def _lookup(values: np.ndarray, mapping: Dict, field: str) -> np.ndarray:
+        result = np.full(len(values), np.nan)
+        for key, code in mapping.items():
+            result[values == key] = code
+        if np.isnan(result).any():
+            unknown = sorted({str(v) for v in values[np.isnan(result)]})
+            raise ValueError(f"Unknown values in column '{field}': {unknown}")
+        return result
+
+    def transform(self, requests: Sequence) -> np.ndarray:
+        """Кодує список валідованих запитів (PredictionRequest) у матрицю (n_requests, n_features)."""
+        n = len(requests)
+        X = np.zeros((n, self.n_features), dtype=np.float64)
+
+        for idx, field in self._passthrough:
+            X[:, idx] = [getattr(r, field) for r in requests]
+
+        for idx, field, mapping in self._mapped:
+            X[:, idx] = [mapping[getattr(r, field)] for r in requests]
+
+        rows = np.arange(n)
+        for field, slots in self._one_hot:
+            cols = np.fromiter((slots.get(getattr(r, field), -1) for r in requests), dtype=np.intp, count=n)
+            hit = cols >= 0
+            X[rows[hit], cols[hit]] = 1.0
+
+        return X
+
+    def transform_one(self, request) -> np.ndarray:
+        """Кодує один запит у рядок форми (1, n_features)."""
+        X = np.zeros((1, self.n_features), dtype=np.float64)
+        row = X[0]
+
+        for idx, field in self._passthrough:
+            row[idx] = getattr(request, field)
+
+        for idx, field, mapping in self._mapped:
+            row[idx] = mapping[getattr(request, field)]
+
+        for field, slots in self._one_hot:
+            idx = slots.get(getattr(request, field))
+            if idx is not None:
+                row[idx] = 1.0
+
+        return X
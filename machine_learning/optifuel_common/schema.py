@@ -0,0 +1,9 @@
+from typing import Literal
+
+# Допустимі значення категоріальних полів рейсу — єдине джерело для валідації
+# запитів (ml_service/app/models.py), кодувальника ознак і таблиці прогнозів.
+# Порядок WeatherConditions змістовний: від спокійної погоди до шторму.
+ShipType = Literal["Oil Service Boat", "Fishing Trawler", "Surfer Boat", "Tanker Ship"]
+RouteID = Literal["Warri-Bonny", "Port Harcourt-Lagos", "Lagos-Apapa", "Escravos-Lagos"]
+FuelType = Literal["HFO", "Diesel"]
+WeatherConditions = Literal["Calm", "Moderate", "Stormy"]
@@ -1,75 +1,177 @@
-import pandas as pd
-import numpy as np
+import argparse
+import copy
+import hashlib
+import io
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
 import joblib
-from sklearn.ensemble import GradientBoostingRegressor
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor
+from sklearn.model_selection import KFold, cross_val_predict
 from sklearn.preprocessing import StandardScaler
-from pathlib import Path
-import os
+
+from ml_service.app.compact_model import export_compact_model
+from ml_service.app.versioning import write_version_manifest
+from optifuel_common.atomic import atomic_write
+from optifuel_common.encoder import FeatureEncoder
 
 # Шляхи (ми будемо запускати це всередині контейнера, тому шляхи абсолютні)
 # Ми закинемо CSV файл прямо в корінь робочої директорії контейнера
-DATA_PATH = Path("ship_fuel_efficiency.csv") 
+DATA_PATH = Path("ship_fuel_efficiency.csv")
 ARTIFACTS_DIR = Path("/app/artifacts")
 
+# Водяний знак: до якого байта журнал рейсів уже врахований моделлю
+WATERMARK_FILE = "retrain_watermark.json"
+# Скільки байтів перед водяним знаком хешуємо, щоб помітити перезаписаний журнал
+PREFIX_CHECK_BYTES = 4096
+
 # Переконаємося, що папка існує
 ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
 
-def retrain():
-    print("🚀 Starting re-training inside Docker...")
+# Рання зупинка HistGradientBoosting відкладає 10% рядків на валідацію; на
+# зовсім малому журналі ця вибірка порожня або випадкова, тож рання зупинка
+# вимикається, а кількість ітерацій обмежується як у GradientBoosting
+MIN_EARLY_STOPPING_ROWS = 100
 
-    if not DATA_PATH.exists():
-        print(f"Error: {DATA_PATH} not found inside container. Please copy it first.")
-        return
+# Доступні рушії бустингу: точний (послідовний) і гістограмний (багатопотоковий,
+# з ранньою зупинкою). Обидва експортуються у той самий компактний артефакт.
+ENGINES = {
+    "gradient_boosting": lambda: GradientBoostingRegressor(n_estimators=100, random_state=42),
+    "hist_gradient_boosting": lambda: HistGradientBoostingRegressor(
+        max_iter=500, early_stopping=True, validation_fraction=0.1, n_iter_no_change=10, random_state=42
+    ),
+}
 
-    # 1. Завантаження
-    print("Loading raw data...")
-    df = pd.read_csv(DATA_PATH)
+def make_model(engine: str, n_rows: int):
+    model = ENGINES[engine]()
+    if isinstance(model, HistGradientBoostingRegressor) and n_rows < MIN_EARLY_STOPPING_ROWS:
+        model.set_params(early_stopping=False, max_iter=100)
+    return model
 
-    # 2. Очищення (видалення CO2, якщо є, щоб уникнути витоку даних)
-    if 'CO2_emissions' in df.columns:
-        df = df.drop('CO2_emissions', axis=1)
+def read_voyages(offset: int = 0):
+    """
+    Читає журнал рейсів від байта offset до останнього повного рядка
+    (рядок, який саме дописується, лишається на наступний запуск).
+    Повертає DataFrame і новий offset.
+    """
+    with open(DATA_PATH, "rb") as f:
+        header = f.readline()
+        start = max(offset, len(header))
+        f.seek(start)
+        data = f.read()
+    data = data[:data.rfind(b"\n") + 1]
+    return pd.read_csv(io.BytesIO(header + data)), start + len(data)
 
-    # 3. Препроцесинг (копіюємо логіку, щоб вона співпадала з main.py)
+def read_recent_voyages(offset: int, n_rows: int, rows_seen: int):
+    """
+    Останні n_rows рейсів перед offset — для перевірки оновленої моделі на
+    вже відомих даних. Читається лише хвіст журналу (розмір оцінюється за
+    середньою довжиною рядка), а не вся історія.
+    """
+    with open(DATA_PATH, "rb") as f:
+        header = f.readline()
+        row_bytes = max(1, (offset - len(header)) // max(rows_seen, 1))
+        start = max(len(header), offset - 2 * n_rows * row_bytes)
+        f.seek(start)
+        data = f.read(offset - start)
+    if start > len(header):
+        # Перший рядок вікна, найімовірніше, обрізаний
+        data = data[data.find(b"\n") + 1:]
+    return pd.read_csv(io.BytesIO(header + data)).tail(n_rows)
+
+def prefix_digest(offset: int) -> str:
+    """SHA-256 останніх PREFIX_CHECK_BYTES байтів журналу перед offset."""
+    start = max(0, offset - PREFIX_CHECK_BYTES)
+    with open(DATA_PATH, "rb") as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+def load_watermark():
+    path = ARTIFACTS_DIR / WATERMARK_FILE
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_watermark(watermark: dict):
+    with atomic_write(ARTIFACTS_DIR / WATERMARK_FILE) as f:
+        json.dump(watermark, f, indent=2)
+
+def rmse(model, X_scaled, y) -> float:
+    return float(np.sqrt(np.mean((model.predict(X_scaled) - y) ** 2)))
+
+def full_rebuild_reason(watermark, args):
+    """Чому інкрементальне оновлення неможливе, або None, якщо можливе."""
+    if args.full:
+        return "requested with --full"
+    if watermark is None:
+        return "no watermark from a previous run"
+    if watermark["engine"] != args.engine:
+        return f"engine changed ({watermark['engine']} -> {args.engine})"
+    if not all((ARTIFACTS_DIR / name).exists() for name in ("best_model.joblib", "scaler.joblib", "feature_encoder.json")):
+        return "model artifacts are missing"
+    if DATA_PATH.stat().st_size < watermark["offset"] or prefix_digest(watermark["offset"]) != watermark["prefix_digest"]:
+        return "voyage log was rewritten since the last run"
+    if watermark["incremental_runs"] >= args.max_incremental_runs:
+        return f"{watermark['incremental_runs']} incremental updates since the last full rebuild"
+    return None
+
+def detect_drift(model, X_scaled, y, watermark: dict, args):
+    """
+    Перевірка дрейфу нових рейсів відносно даних останньої повної перебудови.
+    Скейлер заморожений, тож середнє масштабованої ознаки — це її зсув у
+    стандартних відхиленнях навчальних даних. Замалі партії не перевіряються.
+    """
+    if len(y) < args.drift_min_rows:
+        return None
+
+    shift = np.abs(X_scaled.mean(axis=0))
+    worst = int(np.argmax(shift))
+    if shift[worst] > args.drift_feature_shift:
+        return f"mean of '{watermark['feature_order'][worst]}' shifted by {shift[worst]:.2f} std"
+
+    if not watermark.get("reference_rmse"):
+        return None
+    error_ratio = rmse(model, X_scaled, y) / watermark["reference_rmse"]
+    if error_ratio > args.drift_error_ratio:
+        return f"RMSE on new voyages is {error_ratio:.2f}x the reference"
+    return None
+
+def reference_rmse(engine: str, X_scaled, y, folds: int):
+    """
+    Еталонна помилка для перевірки дрейфу — поза вибіркою: RMSE
+    out-of-fold прогнозів K-fold крос-валідації тієї ж моделі. Помилка на
+    навчальних рядках у бустингу значно нижча, і нові рейси без жодного
+    дрейфу виглядали б гіршими за неї; одна відкладена частина на малому
+    журналі дає надто шумну оцінку. None, якщо рейсів замало для фолдів.
+    """
+    if folds < 2 or len(y) < 2 * folds:
+        return None
+    model = make_model(engine, len(y) * (folds - 1) // folds)
+    predictions = cross_val_predict(model, X_scaled, y, cv=KFold(n_splits=folds, shuffle=True, random_state=42))
+    return float(np.sqrt(np.mean((predictions - y) ** 2)))
+
+def full_retrain(engine: str, reference_folds: int):
+    # 1. Завантаження всього журналу
+    print("Loading raw data...")
+    df, offset = read_voyages()
+
+    # 2-3. Препроцесинг спільним кодувальником ознак — тим самим, що в
+    # preprocessor.py і в сервісі (CO2_emissions та ship_id у ознаки не входять)
     print("Preprocessing...")
-    
-    # Weather Encoding
-    weather_mapping = {'Calm': 0, 'Moderate': 1, 'Stormy': 2}
-    df['weather_conditions'] = df['weather_conditions'].map(weather_mapping)
-
-    # Cyclic Month
-    # Спочатку мапимо назви місяців на числа (якщо вони текстом)
-    month_map = {
-        'January': 1, 'February': 2, 'March': 3, 'April': 4, 'May': 5, 'June': 6,
-        'July': 7, 'August': 8, 'September': 9, 'October': 10, 'November': 11, 'December': 12
-    }
-    # Перевірка: якщо місяць вже число, map поверне NaN, тому робимо перевірку
-    if df['month'].dtype == 'O': # Object (string)
-        df['month_num'] = df['month'].map(month_map)
-    else:
-        df['month_num'] = df['month']
-
-    df['month_sin'] = np.sin(2 * np.pi * df['month_num'] / 12)
-    df['month_cos'] = np.cos(2 * np.pi * df['month_num'] / 12)
-    
-    # Видаляємо проміжні колонки
-    cols_to_drop = ['ship_id', 'month', 'month_num']
-    df = df.drop([c for c in cols_to_drop if c in df.columns], axis=1)
-
-    # One-Hot Encoding
-    categorical_cols = ['ship_type', 'route_id', 'fuel_type']
-    df = pd.get_dummies(df, columns=categorical_cols, drop_first=False) 
-    # Важливо: drop_first=False або True має співпадати з вашою логікою. 
-    # У вашому main.py використовується просто pd.get_dummies без drop_first, 
-    # тому тут я теж прибрав drop_first, щоб кількість колонок зійшлася.
-
-    # Видалення цільової змінної
-    X = df.drop('fuel_consumption', axis=1)
-    y = df['fuel_consumption']
-
-    # Зберігаємо порядок ознак (це критично для main.py)
-    feature_order = list(X.columns)
+    encoder = FeatureEncoder.from_schema(drop_first=True)
+    X = encoder.transform_frame(df)
+    y = df['fuel_consumption'].to_numpy(dtype=float)
+
+    # Зберігаємо порядок ознак і кодувальник (це критично для сервісу)
+    feature_order = encoder.feature_order
     print(f"Saving feature order ({len(feature_order)} features)...")
     joblib.dump(feature_order, ARTIFACTS_DIR / "feature_order.joblib")
+    encoder.save(ARTIFACTS_DIR)
 
     # 4. Масштабування
     print("Scaling...")
@@ -77,13 +179,216 @@ def retrain():
     X_scaled = scaler.fit_transform(X)
     joblib.dump(scaler, ARTIFACTS_DIR / "scaler.joblib")
 
-    # 5. Навчання (Gradient Boosting, бо він був найкращим)
-    print("Training GradientBoostingRegressor...")
-    model = GradientBoostingRegressor(n_estimators=100, random_state=42)
+    # 5. Навчання обраним рушієм бустингу — на всіх рейсах; еталонна помилка
+    # для перевірки дрейфу — з крос-валідації, поза вибіркою
+    print(f"Measuring {reference_folds}-fold cross-validated reference RMSE...")
+    reference = reference_rmse(engine, X_scaled, y, reference_folds)
+    model = make_model(engine, len(y))
+    print(f"Training {type(model).__name__}...")
+    model.fit(X_scaled, y)
+    joblib.dump(model, ARTIFACTS_DIR / "best_model.joblib")
+
+    # 6. Компактний артефакт: скейлер згортається у пороги дерев
+    print("Exporting compact model artifact...")
+    export_compact_model(model, scaler, feature_order, ARTIFACTS_DIR, X_check=X)
+
+    return {
+        "engine": engine,
+        "offset": offset,
+        "prefix_digest": prefix_digest(offset),
+        "rows_seen": len(df),
+        "incremental_runs": 0,
+        "feature_order": feature_order,
+        "reference_rmse": reference,
+        "last_full_rebuild": datetime.now(timezone.utc).isoformat(),
+    }
+
+def added_trees(model, n_new: int, rows_seen: int, cap: int) -> int:
+    """
+    Скільки дерев додати за оновлення: частка нових рейсів у всіх даних
+    отримує таку ж частку дерев, що вже є в ансамблі (не більше cap). Кожне
+    нове дерево зсуває прогнози для всіх рейсів, тож мала партія не повинна
+    отримувати стільки ж дерев, скільки велика.
+    """
+    share = n_new / (rows_seen + n_new)
+    return max(1, min(cap, round(model.n_estimators * share)))
+
+def add_trees(model, X_scaled, y, extra: int, learning_rate: float):
+    """
+    Додає до GradientBoosting extra дерев з власним, меншим learning_rate.
+    sklearn множить усі дерева ансамблю на один model.learning_rate, тож на
+    час донавчання листки старих дерев перераховуються під новий крок (їхній
+    внесок у прогноз не змінюється), а після — нові дерева перераховуються
+    під старий крок, а старі повертаються до збережених значень.
+    """
+    base_rate = model.learning_rate
+    ratio = learning_rate / base_rate
+    n_old = len(model.estimators_)
+    old_values = [tree.tree_.value.copy() for tree in model.estimators_[:, 0]]
+    for tree in model.estimators_[:, 0]:
+        tree.tree_.value[...] /= ratio
+
+    model.set_params(warm_start=True, n_estimators=n_old + extra, learning_rate=learning_rate)
     model.fit(X_scaled, y)
+
+    for tree, values in zip(model.estimators_[:n_old, 0], old_values):
+        tree.tree_.value[...] = values
+    for tree in model.estimators_[n_old:, 0]:
+        tree.tree_.value[...] *= ratio
+    model.set_params(warm_start=False, learning_rate=base_rate)
+
+def significantly_worse(model, candidate, X_check, y_check, z: float) -> bool:
+    """
+    Чи кандидат гірший за модель на тих самих рейсах понад шум вибірки:
+    односторонній парний тест на різниці квадратів помилок. RMSE кількох
+    десятків відкладених рейсів з важким хвостом споживання і сама коливається
+    на відсотки, тож сувора вимога «не гірше» відкидала б оновлення навмання.
+    """
+    diff = (candidate.predict(X_check) - y_check) ** 2 - (model.predict(X_check) - y_check) ** 2
+    if len(diff) < 2:
+        return bool(diff.sum() > 0)
+    return bool(diff.mean() > z * diff.std(ddof=1) / np.sqrt(len(diff)))
+
+def split_holdout(n_rows: int, fraction: float):
+    """Детерміноване розбиття рядків на індекси для навчання і для перевірки."""
+    order = np.random.default_rng(42).permutation(n_rows)
+    n_holdout = int(n_rows * fraction)
+    return order[n_holdout:], order[:n_holdout]
+
+def incremental_retrain(watermark: dict, args):
+    """
+    Донавчання на рейсах після водяного знаку, тож час пропорційний новим
+    даним, а не всій історії. Кодувальник і скейлер заморожені — на них
+    спираються вже навчені дерева; GradientBoosting через warm_start
+    зберігає свої дерева і додає нові з меншим кроком (--update-learning-rate),
+    навчені на залишках нових рейсів разом з вікном останніх відомих рейсів
+    (--history-rows): самі лише кілька десятків нових рядків дерева
+    перенавчають на шум.
+
+    Повертає (водяний знак, None) — оновлений або, якщо оновлювати ще нічого,
+    той самий; або (None, причина), коли потрібна повна перебудова.
+    """
+    print(f"Loading voyages logged after byte {watermark['offset']}...")
+    df, offset = read_voyages(watermark["offset"])
+    if df.empty:
+        print("No new voyages since the last run, artifacts are up to date.")
+        return watermark, None
+    if len(df) < args.min_new_rows:
+        # Водяний знак не рухаємо: рейси накопичуються до наступного запуску
+        print(f"Only {len(df)} new voyages (minimum {args.min_new_rows}), waiting for more.")
+        return watermark, None
+
+    encoder = FeatureEncoder.load(ARTIFACTS_DIR)
+    scaler = joblib.load(ARTIFACTS_DIR / "scaler.joblib")
+    model = joblib.load(ARTIFACTS_DIR / "best_model.joblib")
+
+    if isinstance(model, HistGradientBoostingRegressor):
+        # warm_start у HGB заново будує біни на нових рядках, а старі дерева
+        # розбивають за номерами старих бінів — залишки виходять хибними
+        return None, "HistGradientBoosting re-bins data on warm start and cannot be updated on new voyages only"
+
+    X = encoder.transform_frame(df)
+    y = df['fuel_consumption'].to_numpy(dtype=float)
+    X_scaled = scaler.transform(X)
+
+    drift = detect_drift(model, X_scaled, y, watermark, args)
+    if drift is not None:
+        return None, f"drift detected: {drift}"
+
+    recent = read_recent_voyages(watermark["offset"], args.history_rows, watermark["rows_seen"])
+    X_recent = scaler.transform(encoder.transform_frame(recent))
+    y_recent = recent['fuel_consumption'].to_numpy(dtype=float)
+
+    # Перевірка на копії моделі, донавченій без відкладеної частини нової
+    # партії, на двох наборах: відкладені нові рейси, яких не бачить жодна з
+    # моделей (оновлення не має погіршити прогноз нових рейсів), і вікно
+    # останніх рейсів до водяного знаку (нові дерева не мають зіпсувати вже
+    # вивчене). Оновлення відкидається, лише якщо воно значуще гірше
+    fit_idx, holdout_idx = split_holdout(len(df), args.holdout_fraction)
+    checks = {}
+    if len(holdout_idx):
+        checks["holdout"] = (X_scaled[holdout_idx], y[holdout_idx])
+    checks["history"] = (X_recent, y_recent)
+
+    extra = added_trees(model, len(df), watermark["rows_seen"], args.extra_estimators)
+    candidate = copy.deepcopy(model)
+    print(f"Validating an update with {len(fit_idx)} new and {len(y_recent)} recent voyages (+{extra} trees)...")
+    add_trees(candidate, np.vstack([X_recent, X_scaled[fit_idx]]), np.concatenate([y_recent, y[fit_idx]]),
+              extra, args.update_learning_rate)
+
+    for name, (X_check, y_check) in checks.items():
+        before, after = rmse(model, X_check, y_check), rmse(candidate, X_check, y_check)
+        print(f"Validation RMSE on {len(y_check)} {name} voyages: {before:.2f} -> {after:.2f}")
+        if significantly_worse(model, candidate, X_check, y_check, args.validation_z):
+            # Оновлену модель не зберігаємо — артефакти на диску лишаються попередніми
+            return None, f"updated model is worse on {name} voyages ({before:.2f} -> {after:.2f})"
+
+    # Перевірку пройдено: те саме оновлення на всіх нових рейсах, разом з
+    # відкладеними — водяний знак переходить і через них, тож інакше вони
+    # ніколи не потрапили б у навчання
+    print(f"Updating {type(model).__name__} with all {len(df)} new voyages...")
+    add_trees(model, np.vstack([X_recent, X_scaled]), np.concatenate([y_recent, y]), extra, args.update_learning_rate)
     joblib.dump(model, ARTIFACTS_DIR / "best_model.joblib")
 
+    print("Exporting compact model artifact...")
+    export_compact_model(model, scaler, encoder.feature_order, ARTIFACTS_DIR, X_check=X)
+
+    return dict(
+        watermark,
+        offset=offset,
+        prefix_digest=prefix_digest(offset),
+        rows_seen=watermark["rows_seen"] + len(df),
+        incremental_runs=watermark["incremental_runs"] + 1,
+    ), None
+
+def retrain(args):
+    print("🚀 Starting re-training inside Docker...")
+
+    if not DATA_PATH.exists():
+        print(f"Error: {DATA_PATH} not found inside container. Please copy it first.")
+        return
+
+    # Нічний запуск за замовчуванням донавчає модель лише на нових рейсах;
+    # повна перебудова — коли донавчання неможливе або перевірка дрейфу це вимагає
+    watermark = load_watermark()
+    reason = full_rebuild_reason(watermark, args)
+    new_watermark = None
+    if reason is None:
+        new_watermark, reason = incremental_retrain(watermark, args)
+        if new_watermark is watermark:
+            return
+    if new_watermark is None:
+        print(f"Full rebuild: {reason}.")
+        new_watermark = full_retrain(args.engine, args.reference_folds)
+
+    # 7. Водяний знак, а маніфест версії — останнім, щоб сервіс не підхопив напівзаписаний набір
+    save_watermark(new_watermark)
+    version = write_version_manifest(ARTIFACTS_DIR)
+    print(f"Artifacts version: {version}")
+
     print("Done! All artifacts updated successfully.")
 
 if __name__ == "__main__":
-    retrain()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Re-train the fuel consumption model inside the container.")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default=os.environ.get("OPTIFUEL_RETRAIN_ENGINE", "gradient_boosting"))
+    parser.add_argument("--full", action="store_true", help="Rebuild from the whole voyage log instead of updating")
+    parser.add_argument("--extra-estimators", type=int, default=20,
+                        help="Max trees added per incremental update (scaled down for small batches)")
+    parser.add_argument("--min-new-rows", type=int, default=50,
+                        help="Wait until at least this many new voyages are logged before updating")
+    parser.add_argument("--holdout-fraction", type=float, default=0.2,
+                        help="Share of new voyages held out to validate an incremental update")
+    parser.add_argument("--history-rows", type=int, default=500,
+                        help="Recent voyages before the watermark trained on alongside new ones and used for validation")
+    parser.add_argument("--update-learning-rate", type=float, default=0.01,
+                        help="Learning rate of trees added by an incremental update")
+    parser.add_argument("--validation-z", type=float, default=1.64,
+                        help="Fall back to a full rebuild when an update is worse on validation voyages "
+                             "by more than this many standard errors (one-sided paired test)")
+    parser.add_argument("--max-incremental-runs", type=int, default=30, help="Force a full rebuild after this many updates")
+    parser.add_argument("--drift-min-rows", type=int, default=50, help="Skip drift checks for smaller batches")
+    parser.add_argument("--drift-feature-shift", type=float, default=1.0, help="Max mean shift of a scaled feature, in std")
+    parser.add_argument("--drift-error-ratio", type=float, default=1.5, help="Max RMSE on new voyages relative to the cross-validated RMSE of the last full rebuild")
+    parser.add_argument("--reference-folds", type=int, default=5,
+                        help="Cross-validation folds for the reference RMSE measured on a full rebuild")
+    retrain(parser.parse_args())
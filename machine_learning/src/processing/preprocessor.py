@@ -2,13 +2,41 @@ import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
+from contextlib import ExitStack
 from pathlib import Path
+import argparse
 import logging
+import shutil
 import joblib
 
+# Бінарний формат оброблених даних, спільний з train.py, і кодувальник ознак, спільний із сервісом.
+# Запуск з директорії machine_learning: python -m src.processing.preprocessor
+from optifuel_common.encoder import FeatureEncoder
+from src.processing.processed_data import SPLITS, append_rows, save_processed_data, stream_processed_arrays, write_manifest
+
 # Налаштування логування для відстеження процесу
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Константи splitmix64 — хешу, що перетворює номер рядка на псевдовипадкове число
+_SPLITMIX_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_SPLITMIX_MUL1 = np.uint64(0xBF58476D1CE4E5B9)
+_SPLITMIX_MUL2 = np.uint64(0x94D049BB133111EB)
+
+
+def _test_rows(offset: int, n_rows: int, test_size: float, random_state: int) -> np.ndarray:
+    """
+    Маска тестових рядків для частини, що починається з рядка offset. Рядок
+    i — тестовий, якщо splitmix64(i, random_state) / 2**64 < test_size: рішення
+    залежить лише від номера рядка і зерна, а не від розбиття файлу на частини.
+    """
+    with np.errstate(over='ignore'):
+        z = (np.arange(offset, offset + n_rows, dtype=np.uint64) + np.uint64(random_state)) * _SPLITMIX_GAMMA
+        z = (z ^ (z >> np.uint64(30))) * _SPLITMIX_MUL1
+        z = (z ^ (z >> np.uint64(27))) * _SPLITMIX_MUL2
+        z ^= z >> np.uint64(31)
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53) < test_size
+
+
 class FuelDataProcessor:
     """
     Клас для повного циклу передпроцесингу даних про ефективність палива на суднах.
@@ -20,15 +48,98 @@ class FuelDataProcessor:
         self.processed_df = None
         self.X_train, self.X_test, self.y_train, self.y_test = [None] * 4
         self.scaler = StandardScaler()
-        self.feature_order = None
+        # Той самий кодувальник, що й у ml_service: зберігається разом із моделлю
+        self.encoder = FeatureEncoder.from_schema(drop_first=True)
+        self.feature_order = self.encoder.feature_order
+        self.target_column = None
 
     def execute(self, target_column: str, test_size: float = 0.2, random_state: int = 42):
         """Запускає повний конвеєр обробки даних."""
+        self.target_column = target_column
         self._load_data()
         self._preprocess()
         self._split_and_scale_data(target_column, test_size, random_state)
         self._save_artifacts()
 
+    def execute_streaming(self, target_column: str, chunksize: int = 100_000, test_size: float = 0.2, random_state: int = 42):
+        """
+        Потоковий конвеєр для сирих файлів, більших за пам'ять.
+
+        Сирий CSV читається один раз частинами по chunksize рядків; у пам'яті
+        одночасно лише одна частина. Рядок потрапляє в тест за детермінованим
+        хешем свого номера (_test_rows), тож розбиття не залежить від chunksize
+        і не потребує масивів на весь файл; частка тесту — test_size в
+        середньому, а не точно, і розбиття не збігається з train_test_split у execute.
+
+        Закодовані рядки дописуються послідовно у тимчасові файли, а скейлер
+        навчається через partial_fit на тренувальних. Далі тимчасові файли
+        читаються так само послідовно, масштабуються блоками і дописуються у
+        вихідні .npy — без довільних зсувів і без перезапису на місці.
+        """
+        self.target_column = target_column
+        self.processed_data_dir.mkdir(parents=True, exist_ok=True)
+        spill = {name: self.processed_data_dir / f".{name}.unscaled.tmp" for name in SPLITS}
+        n_features = len(self.feature_order)
+        n_rows = dict.fromkeys(('train', 'test'), 0)
+
+        try:
+            # Прохід по CSV: кодування, partial_fit скейлера, запис немасштабованих рядків
+            with ExitStack() as stack:
+                files = {name: stack.enter_context(open(path, 'wb')) for name, path in spill.items()}
+                for offset, X_chunk, y_chunk in self._encoded_chunks(chunksize):
+                    test_mask = _test_rows(offset, len(X_chunk), test_size, random_state)
+                    for split, mask in (('train', ~test_mask), ('test', test_mask)):
+                        append_rows(files[f'X_{split}'], X_chunk[mask])
+                        append_rows(files[f'y_{split}'], y_chunk[mask])
+                        n_rows[split] += int(mask.sum())
+                    if not test_mask.all():
+                        self.scaler.partial_fit(self._frame(X_chunk[~test_mask]))
+            logging.info(f"Потокова обробка: {n_rows['train']} тренувальних і {n_rows['test']} тестових рядків.")
+            if n_rows['train'] == 0:
+                raise ValueError(f"Файл {self.raw_data_path} не містить тренувальних рядків")
+
+            shapes = {}
+            for split, count in n_rows.items():
+                shapes[f'X_{split}'], shapes[f'y_{split}'] = (count, n_features), (count,)
+
+            # Прохід по тимчасових файлах: масштабування блоками і дозапис у вибірки
+            logging.info("Масштабування та запис вибірок...")
+            with stream_processed_arrays(self.processed_data_dir, shapes) as outputs:
+                for split in n_rows:
+                    with open(spill[f'X_{split}'], 'rb') as f:
+                        while True:
+                            block = np.fromfile(f, dtype=np.float64, count=chunksize * n_features)
+                            if block.size == 0:
+                                break
+                            append_rows(outputs[f'X_{split}'], self.scaler.transform(self._frame(block.reshape(-1, n_features))))
+                    with open(spill[f'y_{split}'], 'rb') as f:
+                        shutil.copyfileobj(f, outputs[f'y_{split}'])
+        finally:
+            for path in spill.values():
+                path.unlink(missing_ok=True)
+
+        write_manifest(self.processed_data_dir, shapes, self.feature_order, target_column)
+        self._save_preprocessing_artifacts()
+
+    def _encoded_chunks(self, chunksize: int):
+        """Частини сирого CSV: (номер першого рядка, закодовані ознаки, ціль)."""
+        offset = 0
+        for chunk in self._read_chunks(chunksize):
+            yield offset, self.encoder.transform_frame(chunk), chunk[self.target_column].to_numpy(dtype=np.float64)
+            offset += len(chunk)
+
+    def _frame(self, X: np.ndarray) -> pd.DataFrame:
+        # Скейлер навчається на DataFrame, як і в execute: однакові feature_names_in_
+        return pd.DataFrame(X, columns=self.feature_order)
+
+    def _read_chunks(self, chunksize: int, **kwargs):
+        logging.info(f"Читання даних з {self.raw_data_path} частинами...")
+        try:
+            return pd.read_csv(self.raw_data_path, chunksize=chunksize, **kwargs)
+        except FileNotFoundError:
+            logging.error(f"Файл не знайдено за шляхом: {self.raw_data_path}")
+            raise
+
     def _load_data(self):
         """Завантажує дані з CSV-файлу."""
         logging.info(f"Завантаження даних з {self.raw_data_path}...")
@@ -40,52 +151,28 @@ class FuelDataProcessor:
             raise
 
     def _preprocess(self):
-        """Виконує обробку даних: кодування, інжиніринг ознак, обробку мультиколінеарності."""
+        """Кодує сирі дані у ознаки моделі спільним кодувальником."""
         logging.info("Початок передпроцесингу даних...")
-        df = self.raw_df.copy()
-        
-        df = self._encode_categorical(df)
-        df = self._engineer_features(df)
-        df = self._handle_multicollinearity(df)
-
-        # Видаляємо ID, він не потрібен для моделі
-        self.processed_df = df.drop(columns=['ship_id'])
+        self.processed_df = self._transform_frame(self.raw_df)
         logging.info("Передпроцесинг завершено.")
 
-    def _encode_categorical(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Кодує категоріальні ознаки."""
-        logging.info("Кодування категоріальних ознак...")
-        weather_mapping = {'Calm': 0, 'Moderate': 1, 'Stormy': 2}
-        df['weather_conditions'] = df['weather_conditions'].map(weather_mapping)
-        df = pd.get_dummies(df, columns=['ship_type', 'route_id', 'fuel_type'], drop_first=True)
-        return df
-
-    def _engineer_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Створює нові, більш інформативні ознаки."""
-        logging.info("Інжиніринг ознак...")
-        month_map = {
-            'January': 1, 'February': 2, 'March': 3, 'April': 4, 'May': 5, 'June': 6,
-            'July': 7, 'August': 8, 'September': 9, 'October': 10, 'November': 11, 'December': 12
-        }
-        df['month_num'] = df['month'].map(month_map)
-        df['month_sin'] = np.sin(2 * np.pi * df['month_num'] / 12)
-        df['month_cos'] = np.cos(2 * np.pi * df['month_num'] / 12)
-        return df.drop(columns=['month', 'month_num'])
-
-    def _handle_multicollinearity(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Видаляє висококорельовані ознаки."""
-        logging.info("Обробка мультиколінеарності (видалення CO2_emissions)...")
-        return df.drop(columns=['CO2_emissions'])
+    def _transform_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Перетворює сирі рядки на ознаки моделі та цільову змінну. Кодування
+        (погода, циклічний місяць, one-hot з drop_first) виконує FeatureEncoder;
+        ship_id та висококорельований CO2_emissions у ознаки не входять.
+        """
+        processed = pd.DataFrame(self.encoder.transform_frame(df), columns=self.feature_order, index=df.index)
+        processed[self.target_column] = df[self.target_column]
+        return processed
 
     def _split_and_scale_data(self, target_column: str, test_size: float, random_state: int):
         """Розділяє дані та масштабує ознаки."""
         logging.info("Розділення даних на тренувальну та тестову вибірки...")
+        self.target_column = target_column
         X = self.processed_df.drop(columns=[target_column])
         y = self.processed_df[target_column]
         
-        # <--- ВАЖЛИВО: Зберігаємо порядок колонок ДО масштабування
-        self.feature_order = X.columns.tolist()
-
         self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
             X, y, test_size=test_size, random_state=random_state
         )
@@ -99,20 +186,37 @@ class FuelDataProcessor:
         logging.info(f"Збереження артефактів у директорію {self.processed_data_dir}...")
         self.processed_data_dir.mkdir(parents=True, exist_ok=True)
 
-        # Збереження датасетів
-        self.X_train.to_csv(self.processed_data_dir / 'X_train.csv', index=False)
-        self.X_test.to_csv(self.processed_data_dir / 'X_test.csv', index=False)
-        self.y_train.to_csv(self.processed_data_dir / 'y_train.csv', index=False, header=True)
-        self.y_test.to_csv(self.processed_data_dir / 'y_test.csv', index=False, header=True)
+        # Збереження датасетів у бінарному форматі (.npy + маніфест) замість CSV:
+        # без форматування/парсингу чисел і без втрати точності
+        save_processed_data(
+            self.processed_data_dir,
+            {
+                'X_train': self.X_train.to_numpy(dtype=np.float64),
+                'X_test': self.X_test.to_numpy(dtype=np.float64),
+                'y_train': self.y_train.to_numpy(dtype=np.float64),
+                'y_test': self.y_test.to_numpy(dtype=np.float64),
+            },
+            self.feature_order,
+            self.target_column,
+        )
 
+        self._save_preprocessing_artifacts()
+
+    def _save_preprocessing_artifacts(self):
         # Збереження скейлера та порядку ознак
         joblib.dump(self.scaler, self.processed_data_dir / 'scaler.joblib')
         joblib.dump(self.feature_order, self.processed_data_dir / 'feature_order.joblib')
+        self.encoder.save(self.processed_data_dir)
 
         logging.info("Всі артефакти передпроцесингу успішно збережено.")
 
 if __name__ == '__main__':
     # --- Блок конфігурації для запуску цього файлу напряму ---
+    parser = argparse.ArgumentParser(description="Передпроцесинг сирих даних про рейси.")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="Потоковий режим: обробляти сирий CSV частинами по стільки рядків")
+    args = parser.parse_args()
+
     BASE_ML_SERVICE_DIR = Path(__file__).parents[2]
 
     RAW_DATA_PATH = BASE_ML_SERVICE_DIR / 'data/raw/ship_fuel_efficiency.csv'
@@ -125,7 +229,10 @@ if __name__ == '__main__':
             raw_data_path=RAW_DATA_PATH,
             processed_data_dir=PROCESSED_DATA_DIR
         )
-        processor.execute(target_column=TARGET_COLUMN)
+        if args.chunksize:
+            processor.execute_streaming(target_column=TARGET_COLUMN, chunksize=args.chunksize)
+        else:
+            processor.execute(target_column=TARGET_COLUMN)
         
         print(f"\nКонвеєр обробки даних успішно завершено.")
         print(f"Збережено у: {PROCESSED_DATA_DIR.resolve()}")
@@ -0,0 +1,140 @@
+import json
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from optifuel_common.atomic import atomic_write
+
+# Бінарний формат оброблених даних: кожна вибірка — окремий .npy (float64,
+# C-порядок), що читається через memory-map без парсингу та без копій.
+# Маніфест фіксує форму, dtype і порядок ознак та пишеться останнім, тож
+# його наявність означає, що всі масиви вже повністю записані.
+MANIFEST_FILE = "dataset_manifest.json"
+FORMAT_VERSION = 1
+SPLITS = ("X_train", "X_test", "y_train", "y_test")
+
+
+def save_processed_data(output_dir: Path, arrays: Dict[str, np.ndarray], feature_order: List[str], target_column: str) -> Path:
+    """Зберігає вибірки у .npy та записує маніфест; повертає шлях до маніфесту."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # Старий маніфест знімаємо одразу, щоб він не вказував на напівзаписані масиви
+    (output_dir / MANIFEST_FILE).unlink(missing_ok=True)
+
+    for name in SPLITS:
+        array = np.ascontiguousarray(arrays[name], dtype=np.float64)
+        with atomic_write(output_dir / f"{name}.npy", "wb") as f:
+            np.save(f, array, allow_pickle=False)
+
+    return write_manifest(output_dir, {name: arrays[name].shape for name in SPLITS}, feature_order, target_column)
+
+
+@contextmanager
+def stream_processed_arrays(output_dir: Path, shapes: Dict[str, Tuple[int, ...]]) -> Iterator[Dict[str, BinaryIO]]:
+    """
+    Відкриває .npy вибірок на послідовний дозапис: заголовок пишеться одразу
+    за відомою формою, далі рядки дописуються через append_rows у порядку
+    надходження — без тримання вибірки в пам'яті і без довільних зсувів.
+    Кожен файл пишеться у тимчасовий і підміняє старий лише після того, як
+    записано рівно стільки рядків, скільки обіцяє форма. Маніфест після
+    заповнення пише write_manifest.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / MANIFEST_FILE).unlink(missing_ok=True)
+
+    with ExitStack() as stack:
+        files, data_start = {}, {}
+        for name in SPLITS:
+            f = stack.enter_context(atomic_write(output_dir / f"{name}.npy", "wb"))
+            header = {"descr": np.dtype(np.float64).str, "fortran_order": False, "shape": tuple(shapes[name])}
+            np.lib.format.write_array_header_1_0(f, header)
+            files[name], data_start[name] = f, f.tell()
+        yield files
+
+        for name, f in files.items():
+            written = (f.tell() - data_start[name]) // np.dtype(np.float64).itemsize
+            if written != int(np.prod(shapes[name])):
+                raise ValueError(f"{name}: записано {written} значень замість {int(np.prod(shapes[name]))}")
+
+
+def append_rows(f: BinaryIO, rows: np.ndarray) -> None:
+    """Дописує рядки в кінець .npy, відкритого stream_processed_arrays."""
+    f.write(np.ascontiguousarray(rows, dtype=np.float64).tobytes())
+
+
+def write_manifest(output_dir: Path, shapes: Dict[str, Tuple[int, ...]], feature_order: List[str], target_column: str) -> Path:
+    """Записує маніфест для вже збережених вибірок заданих форм; повертає шлях до нього."""
+    output_dir = Path(output_dir)
+    entries = {}
+    for name in SPLITS:
+        shape = tuple(shapes[name])
+        if name.startswith("X") and shape[1] != len(feature_order):
+            raise ValueError(f"{name} має {shape[1]} колонок, а feature_order — {len(feature_order)}")
+        entries[name] = {"file": f"{name}.npy", "dtype": np.dtype(np.float64).str, "shape": list(shape)}
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "feature_order": list(feature_order),
+        "target_column": target_column,
+        "arrays": entries,
+    }
+    with atomic_write(output_dir / MANIFEST_FILE) as f:
+        json.dump(manifest, f, indent=2)
+    return output_dir / MANIFEST_FILE
+
+
+def read_manifest(data_dir: Path) -> Optional[dict]:
+    path = Path(data_dir) / MANIFEST_FILE
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_processed_arrays(data_dir: Path, mmap_mode: Optional[str] = "r") -> Dict[str, np.ndarray]:
+    """
+    Відкриває вибірки як memory-mapped масиви (mmap_mode=None — читання в пам'ять).
+    Форма та dtype звіряються з маніфестом.
+    """
+    data_dir = Path(data_dir)
+    manifest = read_manifest(data_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"Маніфест {MANIFEST_FILE} не знайдено у {data_dir}")
+    if manifest["format_version"] != FORMAT_VERSION:
+        raise ValueError(f"Непідтримувана версія формату даних: {manifest['format_version']}")
+
+    arrays = {}
+    for name, entry in manifest["arrays"].items():
+        array = np.load(data_dir / entry["file"], mmap_mode=mmap_mode, allow_pickle=False)
+        if list(array.shape) != entry["shape"] or array.dtype.str != entry["dtype"]:
+            raise ValueError(f"{entry['file']} не відповідає маніфесту: {array.dtype}{array.shape}")
+        arrays[name] = array
+    return arrays
+
+
+def load_processed_data(data_dir: Path, mmap_mode: Optional[str] = "r"):
+    """
+    Повертає X_train, X_test, y_train, y_test. Матриці ознак — DataFrame з
+    колонками з маніфесту поверх memory-mapped масивів (без копіювання).
+    """
+    manifest = read_manifest(data_dir)
+    arrays = load_processed_arrays(data_dir, mmap_mode)
+    columns = manifest["feature_order"]
+
+    X_train = pd.DataFrame(arrays["X_train"], columns=columns, copy=False)
+    X_test = pd.DataFrame(arrays["X_test"], columns=columns, copy=False)
+    return X_train, X_test, arrays["y_train"], arrays["y_test"]
+
+
+def load_processed_csv(data_dir: Path):
+    """Читає оброблені дані у старому CSV-форматі (до появи маніфесту)."""
+    data_dir = Path(data_dir)
+    X_train = pd.read_csv(data_dir / 'X_train.csv')
+    y_train = pd.read_csv(data_dir / 'y_train.csv').values.ravel()
+    X_test = pd.read_csv(data_dir / 'X_test.csv')
+    y_test = pd.read_csv(data_dir / 'y_test.csv').values.ravel()
+    return X_train, X_test, y_train, y_test
@@ -0,0 +1,175 @@
+import argparse
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Машиночитаний звіт (метрики та важливість ознак) і вибірка точок для графіків
+REPORT_FILE = "training_report.json"
+SAMPLES_FILE = "prediction_samples.npz"
+# Понад цю кількість точок діаграма розсіювання проріджується
+MAX_SCATTER_POINTS = 5000
+
+
+@dataclass
+class ModelReport:
+    """Усе, що потрібно для звіту по моделі, — без самої моделі, тож легко передається у воркери."""
+    name: str
+    metrics: Dict[str, float]
+    y_true: np.ndarray
+    y_pred: np.ndarray
+    importances: Optional[Dict[str, float]] = None
+    importance_kind: Optional[str] = None
+    total_points: int = 0
+
+
+def feature_importances(model, feature_names: Sequence[str]):
+    """Повертає (важливість за ознаками, вид) або (None, None), якщо модель її не має."""
+    if hasattr(model, 'feature_importances_'):
+        values, kind = model.feature_importances_, "importance"
+    elif hasattr(model, 'coef_'):
+        values, kind = np.abs(model.coef_), "abs_coefficient"
+    else:
+        return None, None
+    return {name: float(value) for name, value in zip(feature_names, np.ravel(values))}, kind
+
+
+def downsample(y_true: np.ndarray, y_pred: np.ndarray, max_points: int = MAX_SCATTER_POINTS, random_state: int = 42):
+    """Випадкова підвибірка пар (факт, прогноз) без повторів, якщо точок більше за max_points."""
+    y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+    if max_points <= 0 or len(y_true) <= max_points:
+        return y_true, y_pred
+    idx = np.sort(np.random.default_rng(random_state).choice(len(y_true), max_points, replace=False))
+    return y_true[idx], y_pred[idx]
+
+
+def build_model_report(name: str, model, metrics: Dict[str, float], y_true, y_pred,
+                       feature_names: Sequence[str], max_points: int = MAX_SCATTER_POINTS) -> ModelReport:
+    importances, kind = feature_importances(model, feature_names)
+    sample_true, sample_pred = downsample(y_true, y_pred, max_points)
+    return ModelReport(name, {k: float(v) for k, v in metrics.items()}, sample_true, sample_pred,
+                       importances, kind, total_points=len(y_true))
+
+
+def write_report(reports: List[ModelReport], output_dir: Path, best_model: Optional[str] = None) -> Path:
+    """Пише метрики й важливість ознак у JSON, а проріджені прогнози — у .npz для графіків на вимогу."""
+    output_dir = Path(output_dir)
+    report = {
+        "best_model": best_model,
+        "models": {
+            r.name: {
+                "metrics": r.metrics,
+                "feature_importance": r.importances,
+                "feature_importance_kind": r.importance_kind,
+                "test_points": r.total_points,
+                "plotted_points": int(len(r.y_true)),
+            }
+            for r in reports
+        },
+    }
+    with open(output_dir / REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    samples = {}
+    for i, r in enumerate(reports):
+        samples[f"{i}_y_true"], samples[f"{i}_y_pred"] = r.y_true, r.y_pred
+    np.savez_compressed(output_dir / SAMPLES_FILE, names=np.array([r.name for r in reports]), **samples)
+    return output_dir / REPORT_FILE
+
+
+def load_report(output_dir: Path) -> List[ModelReport]:
+    """Відновлює звіти моделей із JSON та .npz, записаних write_report."""
+    output_dir = Path(output_dir)
+    with open(output_dir / REPORT_FILE, encoding="utf-8") as f:
+        report = json.load(f)
+    samples = np.load(output_dir / SAMPLES_FILE, allow_pickle=False)
+
+    reports = []
+    for i, name in enumerate(samples["names"]):
+        entry = report["models"][str(name)]
+        reports.append(ModelReport(
+            str(name), entry["metrics"], samples[f"{i}_y_true"], samples[f"{i}_y_pred"],
+            entry["feature_importance"], entry["feature_importance_kind"], entry["test_points"],
+        ))
+    return reports
+
+
+def plot_predictions_vs_actual(y_true, y_pred, model_name: str, output_dir: Path, total_points: int = 0):
+    """Візуалізує 'Прогноз vs. Факт'."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(8, 8))
+    sns.scatterplot(x=y_true, y=y_pred, alpha=0.6)
+    plt.plot([y_true.min(), y_true.max()], [y_true.min(), y_true.max()], '--r', linewidth=2)
+    plt.xlabel("Фактичне споживання палива")
+    plt.ylabel("Прогнозоване споживання палива")
+    title = f"Прогноз vs. Факт для моделі: {model_name}"
+    if total_points > len(y_true):
+        title += f"\n(випадкові {len(y_true)} з {total_points} точок)"
+    plt.title(title)
+    plt.grid(True)
+    plt.savefig(output_dir / f"{model_name.replace(' ', '_')}_predictions_vs_actual.png")
+    plt.close()
+
+
+def plot_feature_importance(importances: Dict[str, float], kind: str, model_name: str, output_dir: Path):
+    """Візуалізує важливість ознак для моделі."""
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    import seaborn as sns
+
+    if kind == "abs_coefficient":
+        title = f"Абсолютні коефіцієнти ознак: {model_name}"
+    else:
+        title = f"Важливість ознак: {model_name}"
+    feature_imp = pd.DataFrame({"Value": list(importances.values()), "Feature": list(importances.keys())})
+
+    plt.figure(figsize=(10, 8))
+    sns.barplot(x="Value", y="Feature", data=feature_imp.sort_values(by="Value", ascending=False).head(15))
+    plt.title(title)
+    plt.tight_layout()
+    plt.savefig(output_dir / f"{model_name.replace(' ', '_')}_feature_importance.png")
+    plt.close()
+
+
+def _render_task(report: ModelReport, output_dir: Path) -> str:
+    """Малює графіки однієї моделі у процесі-воркері (без дисплея)."""
+    import matplotlib
+    matplotlib.use("Agg")
+
+    plot_predictions_vs_actual(report.y_true, report.y_pred, report.name, output_dir, report.total_points)
+    if report.importances is not None:
+        plot_feature_importance(report.importances, report.importance_kind, report.name, output_dir)
+    else:
+        logging.warning(f"Модель {report.name} не підтримує відображення важливості ознак.")
+    return report.name
+
+
+def render_plots(reports: List[ModelReport], output_dir: Path, n_jobs: int = -1) -> None:
+    """Малює графіки всіх моделей паралельно — по процесу на модель."""
+    if not reports:
+        return
+    n_jobs = os.cpu_count() if n_jobs in (None, -1) else max(1, n_jobs)
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(reports))) as pool:
+        for name in pool.map(_render_task, reports, [Path(output_dir)] * len(reports)):
+            logging.info(f"Графіки для {name} збережено до {output_dir}")
+
+
+def main(argv=None):
+    """Графіки на вимогу зі збереженого звіту — без повторного навчання."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Побудова графіків зі збереженого звіту навчання.")
+    parser.add_argument('--results-dir', type=Path, default=Path(__file__).parents[2] / 'results')
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Кількість процесів (-1 — усі ядра)")
+    args = parser.parse_args(argv)
+    render_plots(load_report(args.results_dir), args.results_dir, args.n_jobs)
+
+
+if __name__ == '__main__':
+    main()
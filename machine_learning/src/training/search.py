@@ -0,0 +1,336 @@
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from threadpoolctl import threadpool_limits
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import KFold, ParameterGrid, ParameterSampler
+
+
+@dataclass
+class Candidate:
+    """Сімейство моделей для пошуку: фабрика, параметри за замовчуванням і простір пошуку."""
+    name: str
+    factory: Callable[..., Any]
+    defaults: Dict[str, Any]
+    grid: Dict[str, List[Any]] = field(default_factory=dict)
+
+
+# Параметри за замовчуванням збігаються з тими, що раніше були зашиті в train.py,
+# і завжди оцінюються першими — тож кожне сімейство має результат навіть при малому бюджеті
+CANDIDATES = [
+    Candidate("Linear Regression", LinearRegression, {}),
+    Candidate(
+        "Random Forest", RandomForestRegressor,
+        {"n_estimators": 100, "random_state": 42},
+        {"n_estimators": [100, 200, 400], "max_depth": [None, 10, 20], "min_samples_leaf": [1, 2, 5]},
+    ),
+    Candidate(
+        "Gradient Boosting", GradientBoostingRegressor,
+        {"n_estimators": 100, "random_state": 42},
+        {"n_estimators": [100, 200, 400], "learning_rate": [0.05, 0.1], "max_depth": [3, 4, 5], "subsample": [1.0, 0.8]},
+    ),
+    # Гістограмний бустинг: ознаки розбиваються на біни, дерева будуються
+    # багатопотоково, а рання зупинка сама обирає кількість ітерацій
+    Candidate(
+        "Hist Gradient Boosting", HistGradientBoostingRegressor,
+        {"max_iter": 500, "early_stopping": True, "validation_fraction": 0.1,
+         "n_iter_no_change": 10, "random_state": 42},
+        {"learning_rate": [0.05, 0.1], "max_leaf_nodes": [15, 31, 63], "l2_regularization": [0.0, 1.0]},
+    ),
+]
+
+
+@dataclass
+class SearchResult:
+    """
+    Найкраща конфігурація сімейства: параметри, CV-метрика та модель, перенавчена
+    на всій вибірці. Без пошуку (search="none") крос-валідація не виконується і
+    cv_rmse/cv_rmse_std — None.
+    """
+    name: str
+    params: Dict[str, Any]
+    cv_rmse: Optional[float]
+    cv_rmse_std: Optional[float]
+    model: Any = None
+    fit_seconds: float = 0.0
+
+
+def parameter_sets(candidate: Candidate, search: str, n_iter: int, random_state: int) -> List[Dict[str, Any]]:
+    """Конфігурації для перебору: спершу параметри за замовчуванням, далі сітка або випадкова вибірка."""
+    configs = [dict(candidate.defaults)]
+    if search == "none" or not candidate.grid:
+        return configs
+
+    if search == "grid":
+        sampled = list(ParameterGrid(candidate.grid))
+    elif search == "random":
+        sampled = list(ParameterSampler(candidate.grid, n_iter=n_iter, random_state=random_state))
+    else:
+        raise ValueError(f"Невідомий режим пошуку: {search}")
+
+    for params in sampled:
+        config = {**candidate.defaults, **params}
+        if config not in configs:
+            configs.append(config)
+    return configs
+
+
+def _backing_npy(array: np.ndarray) -> Optional[str]:
+    """Шлях до .npy, на який уже відображений масив (наприклад, із load_data), або None."""
+    base = array
+    while base is not None and not isinstance(base, np.memmap):
+        base = base.base
+    if (
+        base is None or not str(base.filename).endswith(".npy")
+        or base.shape != array.shape or base.dtype != array.dtype
+        or not array.flags["C_CONTIGUOUS"]
+        or base.__array_interface__["data"][0] != array.__array_interface__["data"][0]
+    ):
+        return None
+    return str(base.filename)
+
+
+def share_array(array: np.ndarray, tmp_dir: Path, name: str) -> str:
+    """
+    Повертає .npy, який воркери відкривають через memory-map: сторінки файлу
+    спільні для всіх процесів, тож матриця не копіюється в кожен воркер.
+    """
+    path = _backing_npy(array)
+    if path is not None:
+        return path
+    path = str(Path(tmp_dir) / f"{name}.npy")
+    np.save(path, np.ascontiguousarray(array, dtype=np.float64), allow_pickle=False)
+    return path
+
+
+# --- Стан процесу-воркера: відображені дані та розбиття на фолди ---
+_worker_X: Optional[np.ndarray] = None
+_worker_y: Optional[np.ndarray] = None
+_worker_folds: List[Tuple[np.ndarray, np.ndarray]] = []
+
+
+def _init_worker(X_path: str, y_path: str, cv: int, random_state: int, threads: int) -> None:
+    global _worker_X, _worker_y, _worker_folds
+    # Багатопотокові моделі (OpenMP у HistGradientBoosting) ділять ядра між процесами пулу
+    threadpool_limits(limits=threads)
+    _worker_X = np.load(X_path, mmap_mode="r")
+    _worker_y = np.load(y_path, mmap_mode="r")
+    # Розбиття детерміноване, тож кожен воркер відтворює його сам замість передачі індексів
+    if cv > 1:
+        _worker_folds = list(KFold(n_splits=cv, shuffle=True, random_state=random_state).split(_worker_X))
+
+
+def _cv_task(factory: Callable[..., Any], params: Dict[str, Any], fold: int) -> Tuple[float, float]:
+    """Навчає конфігурацію на одному фолді; повертає (RMSE на валідації, час навчання)."""
+    train_idx, val_idx = _worker_folds[fold]
+    started = time.perf_counter()
+    model = factory(**params)
+    model.fit(_worker_X[train_idx], _worker_y[train_idx])
+    rmse = float(np.sqrt(mean_squared_error(_worker_y[val_idx], model.predict(_worker_X[val_idx]))))
+    return rmse, time.perf_counter() - started
+
+
+def _refit_task(factory: Callable[..., Any], params: Dict[str, Any]) -> Tuple[Any, float]:
+    """Перенавчає найкращу конфігурацію на всій тренувальній вибірці; повертає (модель, час навчання)."""
+    started = time.perf_counter()
+    model = factory(**params)
+    model.fit(np.asarray(_worker_X), np.asarray(_worker_y))
+    return model, time.perf_counter() - started
+
+
+def _stop_pool(pool: ProcessPoolExecutor, abandon: bool) -> None:
+    """
+    Зупиняє пул. З abandon=True задачі, що ще виконуються, не дороблюються:
+    воркери завершуються одразу — бюджет часу обмежує весь пошук, а не лише
+    запуск нових задач.
+    """
+    if not abandon:
+        pool.shutdown(wait=True)
+        return
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+
+def _cross_validate(pool, configs, factories, cv: int, n_jobs: int, deadline: Optional[float]):
+    """
+    Крос-валідація конфігурацій у пулі; повертає (найкраще для кожного
+    сімейства, журнал, чи лишилися покинуті задачі, що ще займають воркери).
+
+    Нові задачі перестають запускатися, коли до дедлайну лишається менше, ніж
+    потрібно на фінальне перенавчання (оцінка — за найдовшим фолдом сімейства,
+    перерахованим на всю вибірку). Задачі, що не встигли до цього моменту,
+    покидаються — їхні конфігурації не мають усіх фолдів і не враховуються.
+    """
+    # Черга задач: конфігурація №0 кожного сімейства, потім №1 і так далі
+    queue = []
+    for rank in range(max(len(v) for v in configs.values())):
+        for name, params_list in configs.items():
+            if rank < len(params_list):
+                queue.extend((name, rank, fold) for fold in range(cv))
+    logging.info(f"Пошук гіперпараметрів: {len(queue) // cv} конфігурацій x {cv} фолдів на {n_jobs} процесах")
+
+    scores: Dict[Tuple[str, int], List[float]] = {}
+    fit_times: Dict[Tuple[str, int], float] = {}
+    longest_fold: Dict[str, float] = {}
+    pending = {}
+    queue_iter = iter(queue)
+
+    def submit_next() -> bool:
+        task = next(queue_iter, None)
+        if task is None:
+            return False
+        name, rank, fold = task
+        pending[pool.submit(_cv_task, factories[name], configs[name][rank], fold)] = (name, rank)
+        return True
+
+    def cv_deadline() -> Optional[float]:
+        if deadline is None:
+            return None
+        # Перенавчання йде на cv/(cv-1) більшій вибірці, сімейства — паралельно на n_jobs процесах
+        refits = [seconds * cv / (cv - 1) for seconds in longest_fold.values()]
+        reserve = max(max(refits, default=0.0), sum(refits) / n_jobs)
+        return deadline - reserve
+
+    # У черзі пулу тримаємо лише стільки задач, скільки воркерів (плюс запас),
+    # щоб після дедлайну не лишалося вже відправлених задач
+    for _ in range(2 * n_jobs):
+        if not submit_next():
+            break
+
+    while pending:
+        stop_at = cv_deadline()
+        timeout = None if stop_at is None else max(stop_at - time.perf_counter(), 0)
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            name, rank = pending.pop(future)
+            rmse, seconds = future.result()
+            scores.setdefault((name, rank), []).append(rmse)
+            fit_times[(name, rank)] = fit_times.get((name, rank), 0.0) + seconds
+            longest_fold[name] = max(longest_fold.get(name, 0.0), seconds)
+
+        stop_at = cv_deadline()
+        if stop_at is not None and time.perf_counter() >= stop_at:
+            logging.warning(f"Бюджет часу на крос-валідацію вичерпано, {len(pending)} задач покинуто, решта конфігурацій пропускається.")
+            for future in pending:
+                future.cancel()
+            break
+        for _ in done:
+            submit_next()
+
+    # Лише конфігурації, для яких пораховані всі фолди
+    log = []
+    best: Dict[str, SearchResult] = {}
+    for (name, rank), fold_scores in scores.items():
+        if len(fold_scores) < cv:
+            continue
+        params = configs[name][rank]
+        entry = SearchResult(name, params, float(np.mean(fold_scores)), float(np.std(fold_scores)))
+        log.append({
+            "model": name, "params": params, "cv_rmse": entry.cv_rmse,
+            "cv_rmse_std": entry.cv_rmse_std, "fit_seconds": fit_times[(name, rank)],
+        })
+        if name not in best or entry.cv_rmse < best[name].cv_rmse:
+            best[name] = entry
+
+    if not best:
+        raise RuntimeError("Жодна конфігурація не встигла пройти крос-валідацію в межах бюджету часу")
+    return best, log, any(not future.done() for future in pending)
+
+
+def run_search(
+    X_train: np.ndarray,
+    y_train: np.ndarray,
+    candidates: Optional[List[Candidate]] = None,
+    search: str = "grid",
+    n_iter: int = 10,
+    cv: int = 5,
+    n_jobs: int = -1,
+    time_budget: Optional[float] = None,
+    random_state: int = 42,
+) -> Tuple[Dict[str, SearchResult], List[Dict[str, Any]]]:
+    """
+    Паралельний пошук гіперпараметрів з крос-валідацією у пулі процесів.
+
+    Кожна задача пулу — одна конфігурація на одному фолді. Задачі йдуть
+    по черзі між сімействами (спершу всі параметри за замовчуванням), тож
+    бюджет часу, що вичерпався, обрізає найменш пріоритетні конфігурації.
+    З search="none" крос-валідації немає: параметри за замовчуванням кожного
+    сімейства одразу навчаються на всій вибірці.
+
+    time_budget обмежує весь пошук разом з фінальним перенавчанням: моделі,
+    що не перенавчилися до дедлайну, пропускаються, а їхні воркери
+    зупиняються. Повертає найкращий результат для кожного сімейства та
+    журнал усіх оцінених конфігурацій.
+    """
+    candidates = candidates or CANDIDATES
+    direct = search == "none"
+    if not direct and cv < 2:
+        raise ValueError("Крос-валідація потребує щонайменше 2 фолди")
+    n_jobs = os.cpu_count() if n_jobs in (None, -1) else max(1, n_jobs)
+    factories = {c.name: c.factory for c in candidates}
+    configs = {c.name: parameter_sets(c, search, n_iter, random_state) for c in candidates}
+
+    started = time.perf_counter()
+    deadline = started + time_budget if time_budget else None
+
+    with tempfile.TemporaryDirectory(prefix="optifuel_search_") as tmp_dir:
+        X_path = share_array(np.asarray(X_train), tmp_dir, "X_train")
+        y_path = share_array(np.asarray(y_train), tmp_dir, "y_train")
+
+        def start_pool() -> ProcessPoolExecutor:
+            return ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                       initargs=(X_path, y_path, 0 if direct else cv, random_state,
+                                                 max(1, os.cpu_count() // n_jobs)))
+
+        pool = start_pool()
+        abandon = True
+        try:
+            if direct:
+                logging.info(f"Навчання {len(candidates)} моделей з фіксованими параметрами без крос-валідації")
+                best = {name: SearchResult(name, params_list[0], None, None) for name, params_list in configs.items()}
+                log = []
+            else:
+                best, log, abandoned = _cross_validate(pool, configs, factories, cv, n_jobs, deadline)
+                if abandoned:
+                    # Покинуті фолди ще займають воркери — перенавчання йде у свіжому пулі
+                    _stop_pool(pool, abandon=True)
+                    pool = start_pool()
+
+            # Фінальне перенавчання найкращих конфігурацій — теж паралельно і в межах бюджету
+            refits = {pool.submit(_refit_task, factories[name], result.params): name for name, result in best.items()}
+            timeout = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            done, not_done = wait(refits, timeout=timeout)
+            for future in done:
+                result = best[refits[future]]
+                result.model, result.fit_seconds = future.result()
+            for future in not_done:
+                logging.warning(f"{refits[future]}: перенавчання не вклалося в бюджет часу {time_budget} с, модель пропускається.")
+                del best[refits[future]]
+            abandon = bool(not_done)
+        finally:
+            _stop_pool(pool, abandon)
+
+    if not best:
+        raise RuntimeError("Жодна модель не встигла навчитися в межах бюджету часу")
+    if direct:
+        log = [{"model": name, "params": result.params, "cv_rmse": None, "cv_rmse_std": None,
+                "fit_seconds": result.fit_seconds} for name, result in best.items()]
+
+    for name, result in best.items():
+        if result.cv_rmse is not None:
+            logging.info(f"{name}: найкраща CV RMSE={result.cv_rmse:.4f} з параметрами {result.params}")
+    logging.info(f"Пошук завершено за {time.perf_counter() - started:.1f} с")
+    return best, log
@@ -1,19 +1,14 @@
 import pandas as pd
+import argparse
 import logging
 import joblib
 import shutil
+import time
 from pathlib import Path
 
-# Моделі
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-
 # Метрики
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 
-# Візуалізація
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
 
 # Налаштування логування
@@ -26,14 +21,26 @@ PROCESSED_DATA_DIR = BASE_DIR / 'data/processed'
 ARTIFACTS_DIR = BASE_DIR / 'artifacts'
 RESULTS_DIR = BASE_DIR / 'results'
 
+# Спільний з ml_service експорт компактного артефакту.
+# Запуск з директорії machine_learning: python -m src.training.train
+from ml_service.app.compact_model import export_compact_model
+from ml_service.app.versioning import write_version_manifest
+from src.processing.processed_data import MANIFEST_FILE, load_processed_csv, load_processed_data
+from src.training.report import MAX_SCATTER_POINTS, build_model_report, render_plots, write_report
+from src.training.search import run_search
+
 def load_data(data_dir: Path):
-    """Завантажує оброблені дані з файлів."""
+    """
+    Завантажує оброблені дані: бінарний формат відкривається через memory-map
+    без копіювання, CSV читається лише для даних, збережених старою версією.
+    """
     logging.info(f"Завантаження даних з директорії {data_dir}...")
     try:
-        X_train = pd.read_csv(data_dir / 'X_train.csv')
-        y_train = pd.read_csv(data_dir / 'y_train.csv').values.ravel()
-        X_test = pd.read_csv(data_dir / 'X_test.csv')
-        y_test = pd.read_csv(data_dir / 'y_test.csv').values.ravel()
+        if (data_dir / MANIFEST_FILE).exists():
+            X_train, X_test, y_train, y_test = load_processed_data(data_dir)
+        else:
+            logging.warning("Маніфест даних не знайдено, читаємо застарілий CSV-формат.")
+            X_train, X_test, y_train, y_test = load_processed_csv(data_dir)
         logging.info("Дані успішно завантажено.")
         return X_train, X_test, y_train, y_test
     except FileNotFoundError as e:
@@ -49,71 +56,78 @@ def evaluate_model(y_true, y_pred):
     }
     return metrics
 
-def plot_predictions_vs_actual(y_true, y_pred, model_name: str, output_dir: Path):
-    """Візуалізує 'Прогноз vs. Факт'."""
-    plt.figure(figsize=(8, 8))
-    sns.scatterplot(x=y_true, y=y_pred, alpha=0.6)
-    plt.plot([y_true.min(), y_true.max()], [y_true.min(), y_true.max()], '--r', linewidth=2)
-    plt.xlabel("Фактичне споживання палива")
-    plt.ylabel("Прогнозоване споживання палива")
-    plt.title(f"Прогноз vs. Факт для моделі: {model_name}")
-    plt.grid(True)
-    plt.savefig(output_dir / f"{model_name.replace(' ', '_')}_predictions_vs_actual.png")
-    plt.close()
-
-def plot_feature_importance(model, feature_names, model_name: str, output_dir: Path):
-    """Візуалізує важливість ознак для моделі."""
-    if hasattr(model, 'feature_importances_'):
-        importances = model.feature_importances_
-        title = f"Важливість ознак: {model_name}"
-    elif hasattr(model, 'coef_'):
-        importances = np.abs(model.coef_)
-        title = f"Абсолютні коефіцієнти ознак: {model_name}"
-    else:
-        logging.warning(f"Модель {model_name} не підтримує відображення важливості ознак.")
-        return
-
-    feature_imp = pd.DataFrame(sorted(zip(importances, feature_names)), columns=['Value','Feature'])
-    
-    plt.figure(figsize=(10, 8))
-    sns.barplot(x="Value", y="Feature", data=feature_imp.sort_values(by="Value", ascending=False).head(15))
-    plt.title(title)
-    plt.tight_layout()
-    plt.savefig(output_dir / f"{model_name.replace(' ', '_')}_feature_importance.png")
-    plt.close()
-
-def main():
+def single_row_latency(model, row: np.ndarray, repeats: int = 50) -> float:
+    """Медіанна затримка прогнозу для одного рядка в мікросекундах — як у запиті /predict."""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        model.predict(row)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings) * 1e6)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Навчання та порівняння моделей споживання палива.")
+    parser.add_argument('--search', choices=['grid', 'random', 'none'], default='none',
+                        help="Пошук гіперпараметрів: лише параметри за замовчуванням без CV (типово), "
+                             "випадкова вибірка або повна сітка (десятки конфігурацій x фолди — хвилини)")
+    parser.add_argument('--n-iter', type=int, default=10, help="Кількість конфігурацій на модель для --search random")
+    parser.add_argument('--cv', type=int, default=5, help="Кількість фолдів крос-валідації")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Кількість процесів (-1 — усі ядра)")
+    parser.add_argument('--time-budget', type=float, default=None,
+                        help="Бюджет часу на пошук разом з фінальним навчанням моделей, у секундах "
+                             "(за замовчуванням без обмеження); моделі, що не вклалися, пропускаються")
+    parser.add_argument('--no-plots', action='store_true',
+                        help="Не малювати графіки (JSON-звіт пишеться завжди; графіки на вимогу — src/training/report.py)")
+    parser.add_argument('--max-scatter-points', type=int, default=MAX_SCATTER_POINTS,
+                        help="Максимум точок на діаграмі 'Прогноз vs. Факт' (0 — без проріджування)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Головна функція для запуску навчання та оцінки моделей."""
+    args = parse_args(argv)
+
     # Створення директорій
     ARTIFACTS_DIR.mkdir(exist_ok=True)
     RESULTS_DIR.mkdir(exist_ok=True)
 
     # Завантаження даних
     X_train, X_test, y_train, y_test = load_data(PROCESSED_DATA_DIR)
-
-    # Визначення моделей
-    models = {
-        "Linear Regression": LinearRegression(),
-        "Random Forest": RandomForestRegressor(n_estimators=100, random_state=42),
-        "Gradient Boosting": GradientBoostingRegressor(n_estimators=100, random_state=42)
-    }
+    feature_names = X_train.columns
+
+    # Паралельний пошук: кожне сімейство моделей отримує найкращу за CV конфігурацію,
+    # перенавчену на всій тренувальній вибірці (з --search none — параметри за
+    # замовчуванням, навчені одразу, без CV)
+    searched, search_log = run_search(
+        X_train.to_numpy(), y_train,
+        search=args.search, n_iter=args.n_iter, cv=args.cv,
+        n_jobs=args.n_jobs, time_budget=args.time_budget,
+    )
+    pd.DataFrame(search_log).sort_values('cv_rmse').to_csv(RESULTS_DIR / 'hyperparameter_search.csv', index=False)
 
     results = {}
+    reports = []
     best_model = None
     best_rmse = float('inf')
     best_model_name = ""
 
-    # Цикл навчання та оцінки
-    for name, model in models.items():
-        logging.info(f"--- Навчання моделі: {name} ---")
-        model.fit(X_train, y_train)
-        y_pred = model.predict(X_test)
+    # Оцінка найкращих конфігурацій на тестовій вибірці
+    for name, result in searched.items():
+        logging.info(f"--- Оцінка моделі: {name} ---")
+        model = result.model
+        X_test_np = X_test.to_numpy()
+        started = time.perf_counter()
+        y_pred = model.predict(X_test_np)
+        batch_seconds = time.perf_counter() - started
         metrics = evaluate_model(y_test, y_pred)
+        if result.cv_rmse is not None:
+            metrics["CV RMSE"] = result.cv_rmse
+        metrics["Fit time (s)"] = result.fit_seconds
+        metrics["Batch predict (us/row)"] = batch_seconds / len(X_test_np) * 1e6
+        metrics["Single-row predict (us)"] = single_row_latency(model, X_test_np[:1])
         results[name] = metrics
 
         logging.info(f"Метрики для {name}: {metrics}")
-        plot_predictions_vs_actual(y_test, y_pred, name, RESULTS_DIR)
-        plot_feature_importance(model, X_train.columns, name, RESULTS_DIR)
+        reports.append(build_model_report(name, model, metrics, y_test, y_pred, feature_names, args.max_scatter_points))
 
         if metrics["RMSE"] < best_rmse:
             best_rmse = metrics["RMSE"]
@@ -126,14 +140,27 @@ def main():
         logging.info(f"Збереження найкращої моделі '{best_model_name}' та артефактів...")
         joblib.dump(best_model, ARTIFACTS_DIR / 'best_model.joblib')
 
-        # Копіюємо скейлер і порядок ознак з папки processed до artifacts
-        for artifact in ['scaler.joblib', 'feature_order.joblib']:
+        # Копіюємо скейлер, порядок ознак і кодувальник з папки processed до artifacts
+        for artifact in ['scaler.joblib', 'feature_order.joblib', 'feature_encoder.json']:
             try:
                 shutil.copy(PROCESSED_DATA_DIR / artifact, ARTIFACTS_DIR / artifact)
                 logging.info(f"Артефакт '{artifact}' скопійовано до {ARTIFACTS_DIR}")
             except FileNotFoundError as e:
                 logging.error(f"Помилка: {e}. Запустіть скрипт передпроцесингу.")
                 raise
+
+        # Компактний артефакт зі згорнутим скейлером для ml_service
+        scaler = joblib.load(ARTIFACTS_DIR / 'scaler.joblib')
+        feature_order = joblib.load(ARTIFACTS_DIR / 'feature_order.joblib')
+        export_compact_model(
+            best_model, scaler, feature_order, ARTIFACTS_DIR,
+            X_check=scaler.inverse_transform(X_test.to_numpy())
+        )
+        logging.info(f"Компактний артефакт моделі збережено до {ARTIFACTS_DIR}")
+
+        # Маніфест версії пишеться останнім — сервіс підхопить нову модель лише після нього
+        version = write_version_manifest(ARTIFACTS_DIR)
+        logging.info(f"Версія артефактів: {version}")
     
     # Вивід та збереження підсумкових результатів
     results_df = pd.DataFrame(results).T
@@ -141,5 +168,14 @@ def main():
     print(results_df)
     results_df.to_csv(RESULTS_DIR / 'model_comparison_results.csv')
 
+    # Звіт — окремий етап після збереження артефактів: JSON пишеться завжди,
+    # графіки малюються паралельно або пропускаються з --no-plots
+    report_path = write_report(reports, RESULTS_DIR, best_model_name or None)
+    logging.info(f"Звіт з метриками та важливістю ознак збережено до {report_path}")
+    if args.no_plots:
+        logging.info("Графіки пропущено (--no-plots).")
+    else:
+        render_plots(reports, RESULTS_DIR, args.n_jobs)
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from app.models import PredictionRequest
+from benchmarks.synthetic import generate_voyages, sample_requests
+from optifuel_common.encoder import FeatureEncoder
+
+
+@pytest.fixture(scope="session")
+def encoder():
+    return FeatureEncoder.from_schema(drop_first=True)
+
+
+@pytest.fixture(scope="session")
+def voyages(encoder):
+    """Синтетичний журнал рейсів: сирі ознаки X, ціль y і скейлер, навчений на DataFrame (як у препроцесорі)."""
+    df = generate_voyages(600)
+    X = encoder.transform_frame(df)
+    y = df['fuel_consumption'].to_numpy(dtype=np.float64)
+    scaler = StandardScaler().fit(pd.DataFrame(X, columns=encoder.feature_order))
+    return X, y, scaler
+
+
+@pytest.fixture(scope="session")
+def prediction_requests():
+    return [PredictionRequest(**body) for body in sample_requests(300, random_state=7)]
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+from app import compact_model
+from app.compact_model import ARRAYS_FILE, MANIFEST_FILE, CompactModel, export_compact_model
+
+MODELS = {
+    "linear": lambda: LinearRegression(),
+    "gradient_boosting": lambda: GradientBoostingRegressor(n_estimators=30, max_depth=3, random_state=0),
+    "random_forest": lambda: RandomForestRegressor(n_estimators=15, max_depth=6, random_state=0),
+    "hist_gradient_boosting": lambda: HistGradientBoostingRegressor(max_iter=30, random_state=0),
+}
+
+
+def fit_pipeline(name, X, y, scaler, feature_order):
+    model = MODELS[name]()
+    model.fit(scaler.transform(pd.DataFrame(X, columns=feature_order)), y)
+    return model
+
+
+@pytest.mark.parametrize("name", MODELS)
+def test_compact_matches_sklearn(name, voyages, encoder, tmp_path):
+    X, y, scaler = voyages
+    model = fit_pipeline(name, X, y, scaler, encoder.feature_order)
+    export_compact_model(model, scaler, encoder.feature_order, tmp_path, X_check=X[:100])
+
+    compact = CompactModel.load(tmp_path)
+    expected = model.predict(scaler.transform(pd.DataFrame(X, columns=encoder.feature_order)))
+    np.testing.assert_allclose(compact.predict(X), expected,
+                               rtol=compact_model.CHECK_RTOL, atol=compact_model.CHECK_ATOL)
+
+
+def test_failed_check_keeps_previous_artifact(voyages, encoder, tmp_path, monkeypatch):
+    X, y, scaler = voyages
+    model = fit_pipeline("gradient_boosting", X, y, scaler, encoder.feature_order)
+    export_compact_model(model, scaler, encoder.feature_order, tmp_path, X_check=X[:100])
+    before = {name: (tmp_path / name).read_bytes() for name in (MANIFEST_FILE, ARRAYS_FILE)}
+
+    # Хибне згортання скейлера: пороги зсуваються відносно оригінальної пари
+    stats = compact_model._scaler_stats
+    monkeypatch.setattr(compact_model, "_scaler_stats", lambda s, n: (stats(s, n)[0] + 0.5, stats(s, n)[1]))
+    with pytest.raises(ValueError, match="deviates"):
+        export_compact_model(model, scaler, encoder.feature_order, tmp_path, X_check=X[:100])
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(before)
+    assert all((tmp_path / name).read_bytes() == data for name, data in before.items())
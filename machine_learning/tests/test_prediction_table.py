@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor, RandomForestRegressor
+
+from app.compact_model import CompactModel, export_compact_model
+from app.prediction_table import PredictionTable
+
+MODELS = {
+    "gradient_boosting": lambda: GradientBoostingRegressor(n_estimators=20, max_depth=3, random_state=0),
+    "random_forest": lambda: RandomForestRegressor(n_estimators=5, max_depth=5, random_state=0),
+    "hist_gradient_boosting": lambda: HistGradientBoostingRegressor(max_iter=15, max_leaf_nodes=8, random_state=0),
+}
+
+
+@pytest.mark.parametrize("name", MODELS)
+def test_lookup_matches_model(name, voyages, encoder, prediction_requests, tmp_path):
+    X, y, scaler = voyages
+    model = MODELS[name]()
+    model.fit(scaler.transform(pd.DataFrame(X, columns=encoder.feature_order)), y)
+    export_compact_model(model, scaler, encoder.feature_order, tmp_path)
+    compact = CompactModel.load(tmp_path)
+
+    table = PredictionTable.build(compact, encoder, max_cells=5_000_000)
+    assert table is not None
+
+    expected = compact.predict(encoder.transform(prediction_requests))
+    np.testing.assert_allclose(table.lookup_many(prediction_requests), expected, rtol=1e-9, atol=1e-9)
+    # Випадкові точки, зокрема поза діапазоном навчальних даних
+    assert table.verify(compact, encoder, n_samples=500) < 1e-9
+
+
+def test_build_rejects_oversized_grid(voyages, encoder, tmp_path):
+    X, y, scaler = voyages
+    model = MODELS["gradient_boosting"]()
+    model.fit(scaler.transform(pd.DataFrame(X, columns=encoder.feature_order)), y)
+    export_compact_model(model, scaler, encoder.feature_order, tmp_path)
+
+    assert PredictionTable.build(CompactModel.load(tmp_path), encoder, max_cells=10) is None
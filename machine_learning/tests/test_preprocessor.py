@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_voyages
+from src.processing.preprocessor import FuelDataProcessor
+from src.processing.processed_data import load_processed_arrays
+
+TARGET_COLUMN = 'fuel_consumption'
+
+
+@pytest.fixture(scope="module")
+def raw_csv(tmp_path_factory):
+    path = tmp_path_factory.mktemp("raw") / "ship_fuel_efficiency.csv"
+    generate_voyages(2000).to_csv(path, index=False)
+    return path
+
+
+def test_streaming_split_does_not_depend_on_chunksize(raw_csv, tmp_path):
+    outputs = []
+    for chunksize in (97, 5000):
+        FuelDataProcessor(raw_csv, tmp_path / str(chunksize)).execute_streaming(TARGET_COLUMN, chunksize=chunksize)
+        outputs.append(load_processed_arrays(tmp_path / str(chunksize)))
+
+    small, whole = outputs
+    for name in ('y_train', 'y_test'):
+        np.testing.assert_array_equal(small[name], whole[name])
+    for name in ('X_train', 'X_test'):
+        # partial_fit накопичує статистики частинами — різниця лише в округленні
+        np.testing.assert_allclose(small[name], whole[name], atol=1e-12)
+    assert not list((tmp_path / "97").glob(".*.tmp"))
+
+
+def test_streaming_scaler_is_fitted_on_train_rows(raw_csv, tmp_path):
+    streaming = FuelDataProcessor(raw_csv, tmp_path / "streaming")
+    streaming.execute_streaming(TARGET_COLUMN, chunksize=300, test_size=0.25)
+    arrays = load_processed_arrays(tmp_path / "streaming")
+
+    n_rows = len(arrays['y_train']) + len(arrays['y_test'])
+    assert n_rows == 2000
+    assert abs(len(arrays['y_test']) / n_rows - 0.25) < 0.05
+    # Тренувальна вибірка масштабована власними статистиками
+    np.testing.assert_allclose(np.asarray(arrays['X_train']).mean(axis=0), 0, atol=1e-9)
+
+    raw_train = streaming.scaler.inverse_transform(np.asarray(arrays['X_train']))
+    in_memory = FuelDataProcessor(raw_csv, tmp_path / "in_memory")
+    in_memory.scaler.fit(raw_train)
+    np.testing.assert_allclose(streaming.scaler.mean_, in_memory.scaler.mean_)
+    np.testing.assert_allclose(streaming.scaler.scale_, in_memory.scaler.scale_)
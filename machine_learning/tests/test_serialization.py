@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from app.serialization import _HEADER, accepts_binary, decode_matrix, encode_matrix
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (3, 17), (0, 5)])
+def test_binary_round_trip(shape):
+    matrix = np.random.default_rng(0).normal(size=shape) * 1e6
+    payload = encode_matrix(matrix)
+
+    assert len(payload) == _HEADER.size + matrix.size * 8
+    decoded = decode_matrix(payload)
+    assert decoded.shape == shape
+    np.testing.assert_array_equal(decoded, matrix)
+
+
+def test_binary_round_trip_is_bit_exact():
+    matrix = np.array([[np.nan, np.inf, -np.inf], [-0.0, 5e-324, np.finfo(np.float64).max]])
+    decoded = decode_matrix(encode_matrix(matrix))
+
+    assert decoded.tobytes() == matrix.astype("<f8").tobytes()
+
+
+def test_vector_is_encoded_as_single_row():
+    decoded = decode_matrix(encode_matrix([1.5, 2.5]))
+
+    np.testing.assert_array_equal(decoded, [[1.5, 2.5]])
+
+
+def test_encode_rejects_higher_rank():
+    with pytest.raises(ValueError):
+        encode_matrix(np.zeros((2, 2, 2)))
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("application/x-optifuel-f64", True),
+    ("application/json, application/x-optifuel-f64;q=0.5", True),
+    ("application/x-optifuel-f64;q=0", False),
+    ("application/json", False),
+    (None, False),
+])
+def test_accepts_binary(accept, expected):
+    assert accepts_binary(accept) is expected